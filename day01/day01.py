@@ -1,8 +1,17 @@
+import argparse
+import collections
+import concurrent.futures
 import functools
+import json
+import math
+import mmap
+import os
 import sys
-import re
+import time
 
-ENGLISH_DIGITS = [
+import numpy as np
+
+ENGLISH_DIGITS = (
     "one",
     "two",
     "three",
@@ -12,71 +21,189 @@ ENGLISH_DIGITS = [
     "seven",
     "eight",
     "nine",
-]
+)
 
+ASCII_NEWLINE = ord("\n")
+ASCII_ZERO = ord("0")
 
-def replace_first_english_digit(line, english_digits):
-    first_index = float("inf")
-    to_replace = None
+DIGIT_VALUES = {str(digit): digit for digit in range(10)}
 
-    for english_digit in english_digits:
-        index = line.find(english_digit)
-        if index >= 0 and index < first_index:
-            first_index = index
-            to_replace = english_digit
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
 
-    if to_replace:
-        replacement = str(english_digits.index(to_replace) + 1)
-        parts = line.partition(to_replace)
-        return parts[0] + replacement + parts[2]
 
-    return line
+class DigitMatcher:
+    """
+    DigitMatcher finds the first and last digits in a line, whether they're
+    written as digit characters or spelled out. The vocabulary is compiled
+    into two Aho-Corasick automata (one over the words, one over the words
+    reversed) so each lookup is a single scan of the line, and overlapping
+    spellings like "eightwo" are both seen.
+    """
 
+    def __init__(self, english_digits=()):
+        words = DIGIT_VALUES.copy()
+        for index, english_digit in enumerate(english_digits):
+            words[english_digit] = index + 1
 
-def replace_last_english_digit(line, english_digits):
-    last_index = float("-inf")
-    to_replace = None
+        self.max_word_length = max(len(word) for word in words)
+        self._forward = compile_automaton(words)
+        self._reverse = compile_automaton(
+            {word[::-1]: value for word, value in words.items()}
+        )
 
-    for english_digit in english_digits:
-        index = line.rfind(english_digit)
-        if index >= 0 and index > last_index:
-            last_index = index
-            to_replace = english_digit
+    def first(self, line):
+        transitions, outputs = self._forward
+        state = 0
+        first_start = None
+        first_value = None
 
-    if to_replace:
-        replacement = str(english_digits.index(to_replace) + 1)
-        parts = line.rpartition(to_replace)
-        return parts[0] + replacement + parts[2]
+        for index, c in enumerate(line):
+            if (
+                first_start is not None
+                and index >= first_start + self.max_word_length - 1
+            ):
+                # Nothing that ends from here on can start before what we've found
+                break
 
-    return line
+            state = transitions[state].get(c, 0)
+            output = outputs[state]
+            if not output:
+                continue
 
+            length, value = output[0]
+            start = index - length + 1
+            if first_start is None or start < first_start:
+                first_start = start
+                first_value = value
 
-def parse_calibration_value(line, english_digits=[]):
-    line = line.strip()
+        return first_value
 
-    orig_line = line
+    def last(self, line):
+        transitions, outputs = self._reverse
+        state = 0
 
-    line = replace_first_english_digit(line, english_digits)
-    line = replace_last_english_digit(line, english_digits)
+        for c in reversed(line):
+            state = transitions[state].get(c, 0)
+            output = outputs[state]
+            if output:
+                return output[0][1]
 
-    first_digit_regex = r"^[^\d]*(\d)"
-    last_digit_regex = r"(\d)[^\d]*$"
+        return None
 
-    m = re.search(first_digit_regex, line)
-    if m is None:
-        return 0
-    first_digit = m.group(1)
+    def calibration_value(self, line):
+        first_digit = self.first(line)
+        if first_digit is None:
+            return 0
+        return first_digit * 10 + self.last(line)
 
-    m = re.search(last_digit_regex, line)
-    if m is None:
-        return 0
+    def scan(self, line):
+        """
+        Scans the whole line once, front to back. Returns a tuple of
+        (first_digit, last_digit, first_value, last_value):
+        - first_digit, last_digit: The first and last digit characters
+        - first_value, last_value: The first and last digits, including words
+        Any of these are None if nothing matched.
+        """
+        transitions, outputs = self._forward
+        state = 0
+        first_digit = None
+        last_digit = None
+        first_start = None
+        first_value = None
+        last_start = None
+        last_value = None
+
+        for index, c in enumerate(line):
+            state = transitions[state].get(c, 0)
+            output = outputs[state]
+            if not output:
+                continue
+
+            digit = DIGIT_VALUES.get(c)
+            if digit is not None:
+                if first_digit is None:
+                    first_digit = digit
+                last_digit = digit
+
+            # The longest word ending here starts earliest, the shortest latest
+            length, value = output[0]
+            start = index - length + 1
+            if first_start is None or start < first_start:
+                first_start = start
+                first_value = value
+
+            length, value = output[-1]
+            start = index - length + 1
+            if last_start is None or start >= last_start:
+                last_start = start
+                last_value = value
+
+        return (first_digit, last_digit, first_value, last_value)
+
+    def calibration_values(self, line):
+        """
+        Returns (part1, part2) calibration values for line from a single scan.
+        """
+        first_digit, last_digit, first_value, last_value = self.scan(line)
+        part1_value = 0 if first_digit is None else first_digit * 10 + last_digit
+        part2_value = 0 if first_value is None else first_value * 10 + last_value
+        return (part1_value, part2_value)
+
+
+def compile_automaton(words):
+    """
+    Builds an Aho-Corasick automaton for the given {word: value} dict.
+    Returns a tuple of (transitions, outputs):
+    - transitions: For each state, a dict of character -> next state. Characters
+      not in the dict go back to the root state (0).
+    - outputs: For each state, a tuple of (length, value) for every word
+      ending there, longest first. Empty if no words end there.
+    """
+    transitions = [{}]
+    outputs = [()]
 
-    last_digit = m.group(1)
+    for word, value in words.items():
+        state = 0
+        for c in word:
+            next_state = transitions[state].get(c)
+            if next_state is None:
+                next_state = len(transitions)
+                transitions[state][c] = next_state
+                transitions.append({})
+                outputs.append(())
+            state = next_state
+        outputs[state] = ((len(word), value),)
 
-    if line != orig_line:
-        print(f"{orig_line} --> {line} -> {first_digit + last_digit}")
+    # Walk the trie breadth-first, filling in failure transitions so that
+    # every state has a direct transition for every character in the alphabet
+    alphabet = set("".join(words))
+    failures = [0] * len(transitions)
+    queue = collections.deque(transitions[0].values())
 
-    return int(first_digit + last_digit)
+    while len(queue) > 0:
+        state = queue.popleft()
+        failure = failures[state]
+
+        for c in alphabet:
+            next_state = transitions[state].get(c)
+            if next_state is None:
+                transitions[state][c] = transitions[failure].get(c, 0)
+                continue
+
+            failures[next_state] = transitions[failure].get(c, 0)
+            outputs[next_state] += outputs[failures[next_state]]
+            queue.append(next_state)
+
+    return (transitions, outputs)
+
+
+@functools.cache
+def digit_matcher(english_digits=()):
+    return DigitMatcher(english_digits)
+
+
+def parse_calibration_value(line, english_digits=()):
+    return digit_matcher(tuple(english_digits)).calibration_value(line)
 
 
 def part1(input):
@@ -92,6 +219,340 @@ def part2(input):
     )
 
 
-input = list(sys.stdin)
-print(part1(input))
-print(part2(input))
+def part1_and_part2(input):
+    """
+    Returns (part1, part2) for input, scanning each line just once.
+    """
+    calibration_values = digit_matcher(ENGLISH_DIGITS).calibration_values
+    part1_total = 0
+    part2_total = 0
+
+    for line in input:
+        part1_value, part2_value = calibration_values(line)
+        part1_total += part1_value
+        part2_total += part2_value
+
+    return (part1_total, part2_total)
+
+
+def line_aligned_ranges(data, size):
+    """
+    Splits data (anything bytes-like with a find() method, e.g. an mmap)
+    into (start, stop) byte ranges of roughly the given size. Each range ends
+    just after a newline (or at the end of the data) so no line is split.
+    """
+    start = 0
+    while start < len(data):
+        newline = data.find(b"\n", start + size - 1)
+        stop = len(data) if newline < 0 else newline + 1
+        yield (start, stop)
+        start = stop
+
+
+def part1_buffer(buffer):
+    """
+    Vectorized part1 over a uint8 array of raw input bytes. Each digit is
+    assigned to a line by searching the newline offsets, and the first and
+    last digit of each line are picked out where the line number changes.
+    """
+    # Bytes below "0" wrap around, so this only keeps "0" through "9"
+    digits = buffer - ASCII_ZERO
+    digit_offsets = np.flatnonzero(digits < 10)
+
+    if len(digit_offsets) == 0:
+        return 0
+
+    newline_offsets = np.flatnonzero(buffer == ASCII_NEWLINE)
+    line_numbers = np.searchsorted(newline_offsets, digit_offsets)
+    line_changes = line_numbers[1:] != line_numbers[:-1]
+
+    first_offsets = digit_offsets[np.concatenate(([True], line_changes))]
+    last_offsets = digit_offsets[np.concatenate((line_changes, [True]))]
+
+    first_sum = int(digits[first_offsets].sum(dtype=np.int64))
+    last_sum = int(digits[last_offsets].sum(dtype=np.int64))
+
+    return first_sum * 10 + last_sum
+
+
+def part1_mmap(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return 0
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            total = sum(
+                part1_buffer(buffer[start:stop])
+                for start, stop in line_aligned_ranges(data, chunk_size)
+            )
+
+            # The mmap can't be closed while numpy still has a view of it
+            del buffer
+
+            return total
+
+
+def solve_range(filename, start, stop):
+    """
+    Reads the given byte range of filename (which should be line-aligned)
+    and returns (part1, part2) for just those lines.
+    """
+    with open(filename, "rb") as file:
+        file.seek(start)
+        lines = file.read(stop - start).decode().split("\n")
+
+    return part1_and_part2(lines)
+
+
+def solve_parallel(filename, jobs=None, chunk_size=None):
+    """
+    Splits filename into line-aligned byte ranges and solves them across a
+    pool of processes. Returns (part1, part2) for the whole file.
+    """
+    jobs = jobs or os.cpu_count()
+    size = os.path.getsize(filename)
+
+    if size == 0:
+        return (0, 0)
+
+    if chunk_size is None:
+        # Several ranges per worker keeps them all busy if some finish early
+        chunk_size = min(DEFAULT_CHUNK_SIZE, math.ceil(size / (jobs * 4)))
+
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = list(line_aligned_ranges(data, chunk_size))
+
+    part1_total = 0
+    part2_total = 0
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(
+            solve_range,
+            [filename] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+        )
+        for part1_result, part2_result in results:
+            part1_total += part1_result
+            part2_total += part2_result
+
+    return (part1_total, part2_total)
+
+
+class CalibrationFollower:
+    """
+    CalibrationFollower keeps running part1/part2 totals for a file that is
+    being appended to, along with the byte offset they cover. Each update()
+    only reads the bytes added since the last one. A trailing line without a
+    newline is left for a later update, since it may still be being written,
+    unless the update is final.
+    """
+
+    def __init__(self, filename, offset=0, part1=0, part2=0, inode=None, tail=None):
+        self.filename = filename
+        self.offset = offset
+        self.part1 = part1
+        self.part2 = part2
+        # Which file the totals are for, to notice it being replaced
+        self.inode = inode
+        # (length, part1, part2) for an unterminated last line counted by a
+        # final update, which is taken back out if the line grows
+        self.tail = tail
+
+    def reset(self):
+        self.offset = 0
+        self.part1 = 0
+        self.part2 = 0
+        self.tail = None
+
+    def update(self, chunk_size=DEFAULT_CHUNK_SIZE, final=False):
+        """
+        Reads any complete lines appended since the last update and adds them
+        to the totals. When final is set, a last line without a newline is
+        counted too. Returns True if the totals changed.
+        """
+        before = (self.offset, self.part1, self.part2)
+
+        with open(self.filename, "rb") as file:
+            stat = os.fstat(file.fileno())
+            replaced = self.inode is not None and stat.st_ino != self.inode
+            if replaced or stat.st_size < self.offset:
+                # The file was truncated or replaced, so start over
+                self.reset()
+            self.inode = stat.st_ino
+
+            if self.tail is not None:
+                length, part1_total, part2_total = self.tail
+                self.offset -= length
+                self.part1 -= part1_total
+                self.part2 -= part2_total
+                self.tail = None
+
+            file.seek(self.offset)
+            pending = b""
+
+            while True:
+                block = file.read(chunk_size)
+                if not block:
+                    break
+
+                data = pending + block
+                end = data.rfind(b"\n") + 1
+                pending = data[end:]
+
+                if end == 0:
+                    continue
+
+                lines = data[:end].decode().split("\n")
+                part1_total, part2_total = part1_and_part2(lines)
+                self.part1 += part1_total
+                self.part2 += part2_total
+                self.offset += end
+
+            if final and pending:
+                part1_total, part2_total = part1_and_part2([pending.decode()])
+                self.part1 += part1_total
+                self.part2 += part2_total
+                self.offset += len(pending)
+                self.tail = (len(pending), part1_total, part2_total)
+
+        return (self.offset, self.part1, self.part2) != before
+
+    def save_checkpoint(self, checkpoint_filename):
+        checkpoint = {
+            "offset": self.offset,
+            "part1": self.part1,
+            "part2": self.part2,
+            "inode": self.inode,
+            "tail": self.tail,
+        }
+
+        # Write then rename so an interrupted save doesn't lose the checkpoint
+        temp_filename = checkpoint_filename + ".tmp"
+        with open(temp_filename, "w") as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(temp_filename, checkpoint_filename)
+
+    @staticmethod
+    def load_checkpoint(filename, checkpoint_filename):
+        if not os.path.exists(checkpoint_filename):
+            return CalibrationFollower(filename)
+
+        with open(checkpoint_filename, "r") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+
+        tail = checkpoint.get("tail")
+
+        return CalibrationFollower(
+            filename,
+            checkpoint["offset"],
+            checkpoint["part1"],
+            checkpoint["part2"],
+            checkpoint.get("inode"),
+            tuple(tail) if tail is not None else None,
+        )
+
+
+def follow(follower, interval, checkpoint_filename=None):
+    """
+    Polls the follower's file forever, printing the totals whenever new
+    lines arrive.
+    """
+    while True:
+        if follower.update():
+            if checkpoint_filename is not None:
+                follower.save_checkpoint(checkpoint_filename)
+            print(follower.part1)
+            print(follower.part2, flush=True)
+
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "filename", nargs="?", help="Read input from this file instead of stdin"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory-map the input file and vectorize part 1",
+    )
+    mode.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Split the input file across this many processes (0 for one per CPU)",
+    )
+    mode.add_argument(
+        "-f",
+        "--follow",
+        action="store_true",
+        help="Keep watching the input file and print new totals as lines are appended",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Resume from (and save) running totals in this file, only reading new lines",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between checks for new lines when following (default: 1)",
+    )
+    args = parser.parse_args()
+
+    if (args.mmap or args.jobs is not None) and args.checkpoint is not None:
+        parser.error("--checkpoint can't be combined with --mmap or --jobs")
+
+    uses_file = args.mmap or args.jobs is not None or args.follow or args.checkpoint
+    if uses_file and args.filename is None:
+        parser.error("--mmap, --jobs, --follow and --checkpoint require a filename")
+
+    if args.follow or args.checkpoint is not None:
+        if args.checkpoint is None:
+            follower = CalibrationFollower(args.filename)
+        else:
+            follower = CalibrationFollower.load_checkpoint(
+                args.filename, args.checkpoint
+            )
+
+        if args.follow:
+            try:
+                follow(follower, args.interval, args.checkpoint)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        follower.update(final=True)
+        follower.save_checkpoint(args.checkpoint)
+        print(follower.part1)
+        print(follower.part2)
+        return
+
+    if args.filename is None:
+        for result in part1_and_part2(sys.stdin):
+            print(result)
+        return
+
+    if args.jobs is not None:
+        for result in solve_parallel(args.filename, args.jobs):
+            print(result)
+        return
+
+    if args.mmap:
+        print(part1_mmap(args.filename))
+        with open(args.filename, "r") as input_file:
+            print(part2(input_file))
+        return
+
+    with open(args.filename, "r") as input_file:
+        for result in part1_and_part2(input_file):
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
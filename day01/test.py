@@ -0,0 +1,227 @@
+import os
+import random
+import tempfile
+import unittest
+
+from day01 import (
+    ENGLISH_DIGITS,
+    CalibrationFollower,
+    DigitMatcher,
+    line_aligned_ranges,
+    parse_calibration_value,
+    part1,
+    part1_and_part2,
+    part1_mmap,
+    part2,
+    solve_parallel,
+)
+
+
+def random_lines(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789"
+    return [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))) + "\n"
+        for _ in range(count)
+    ]
+
+
+class TestDay01(unittest.TestCase):
+    def test_parse_calibration_value(self):
+        tests = [
+            {"input": "1abc2", "expected": 12},
+            {"input": "pqr3stu8vwx", "expected": 38},
+            {"input": "treb7uchet", "expected": 77},
+            {"input": "abcdef", "expected": 0},
+        ]
+
+        for t in tests:
+            self.assertEqual(t["expected"], parse_calibration_value(t["input"]))
+
+    def test_parse_calibration_value_with_english_digits(self):
+        tests = [
+            {"input": "two1nine", "expected": 29},
+            {"input": "eightwothree", "expected": 83},
+            {"input": "eightwo", "expected": 82},
+            {"input": "oneight", "expected": 18},
+            {"input": "xtwone3four\n", "expected": 24},
+            {"input": "abcdef", "expected": 0},
+        ]
+
+        for t in tests:
+            self.assertEqual(
+                t["expected"], parse_calibration_value(t["input"], ENGLISH_DIGITS)
+            )
+
+    def test_digit_matcher_prefers_earliest_start(self):
+        matcher = DigitMatcher(["ab", "xabcd"])
+        self.assertEqual(matcher.first("xabcd"), 2)
+        self.assertEqual(matcher.last("xabcd"), 1)
+
+    def test_digit_matcher_scan(self):
+        matcher = DigitMatcher(ENGLISH_DIGITS)
+        self.assertEqual(matcher.scan("xtwone3four"), (3, 3, 2, 4))
+        self.assertEqual(matcher.scan("eightwo"), (None, None, 8, 2))
+        self.assertEqual(matcher.scan("abc"), (None, None, None, None))
+
+        matcher = DigitMatcher(["ab", "xabcd"])
+        self.assertEqual(matcher.scan("xabcd"), (None, None, 2, 1))
+
+    def test_part1_and_part2(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            self.assertEqual(part1_and_part2(input_file), (209, 281))
+
+        words = ["one", "two", "three", "eight", "nine", "ne"]
+        lines = random_lines(500, seed=3)
+        lines += ["".join(random.Random(i).choices(words, k=4)) for i in range(100)]
+        self.assertEqual(part1_and_part2(lines), (part1(lines), part2(lines)))
+
+    def test_part1(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            self.assertEqual(part1(input_file.readlines()), 209)
+
+    def test_part2(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            self.assertEqual(part2(input_file.readlines()), 281)
+
+    def test_line_aligned_ranges(self):
+        data = b"ab\ncdef\n\ngh"
+        ranges = list(line_aligned_ranges(data, 2))
+        self.assertEqual(ranges, [(0, 3), (3, 8), (8, 11)])
+
+    def test_part1_mmap(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        self.assertEqual(part1_mmap(input_filename), 209)
+
+    def test_part1_mmap_matches_part1(self):
+        lines = random_lines(500)
+        lines[-1] = lines[-1].rstrip("\n")
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+            with open(filename, "w") as file:
+                file.writelines(lines)
+
+            for chunk_size in (1, 7, 100, 1 << 20):
+                self.assertEqual(part1_mmap(filename, chunk_size), part1(lines))
+
+    def test_part1_mmap_empty_file(self):
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+            open(filename, "w").close()
+            self.assertEqual(part1_mmap(filename), 0)
+
+    def test_solve_parallel(self):
+        lines = random_lines(500, seed=1)
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+            with open(filename, "w") as file:
+                file.writelines(lines)
+
+            self.assertEqual(
+                solve_parallel(filename, jobs=2, chunk_size=64),
+                (part1(lines), part2(lines)),
+            )
+
+    def test_calibration_follower(self):
+        lines = random_lines(200, seed=2)
+
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+            checkpoint_filename = os.path.join(dir, "checkpoint.json")
+
+            with open(filename, "w") as file:
+                file.writelines(lines[:100])
+                file.write("1abc")
+
+            follower = CalibrationFollower(filename)
+            self.assertTrue(follower.update(chunk_size=16))
+            self.assertEqual(follower.part1, part1(lines[:100]))
+            self.assertEqual(follower.part2, part2(lines[:100]))
+            self.assertFalse(follower.update())
+
+            follower.save_checkpoint(checkpoint_filename)
+
+            with open(filename, "a") as file:
+                file.write("2\n")
+                file.writelines(lines[100:])
+
+            follower = CalibrationFollower.load_checkpoint(
+                filename, checkpoint_filename
+            )
+            self.assertTrue(follower.update())
+
+            expected_lines = lines[:100] + ["1abc2\n"] + lines[100:]
+            self.assertEqual(follower.part1, part1(expected_lines))
+            self.assertEqual(follower.part2, part2(expected_lines))
+            self.assertEqual(follower.offset, os.path.getsize(filename))
+
+    def test_calibration_follower_truncated_file(self):
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+
+            with open(filename, "w") as file:
+                file.write("1abc2\npqr3stu8vwx\n")
+
+            follower = CalibrationFollower(filename)
+            follower.update()
+            self.assertEqual(follower.part1, 50)
+
+            with open(filename, "w") as file:
+                file.write("treb7uchet\n")
+
+            follower.update()
+            self.assertEqual(follower.part1, 77)
+
+    def test_calibration_follower_final_update(self):
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+            checkpoint_filename = os.path.join(dir, "checkpoint.json")
+
+            with open(filename, "w") as file:
+                file.write("1abc2\npqr3stu8vwx")
+
+            follower = CalibrationFollower(filename)
+            follower.update(final=True)
+            self.assertEqual((follower.part1, follower.part2), (50, 50))
+            follower.save_checkpoint(checkpoint_filename)
+
+            # The last line keeps going after the final update
+            with open(filename, "a") as file:
+                file.write("9\ntwo\n")
+
+            follower = CalibrationFollower.load_checkpoint(
+                filename, checkpoint_filename
+            )
+            self.assertTrue(follower.update())
+
+            expected_lines = ["1abc2\n", "pqr3stu8vwx9\n", "two\n"]
+            self.assertEqual(follower.part1, part1(expected_lines))
+            self.assertEqual(follower.part2, part2(expected_lines))
+
+    def test_calibration_follower_replaced_file(self):
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "input.txt")
+
+            with open(filename, "w") as file:
+                file.write("1abc2\n")
+
+            follower = CalibrationFollower(filename)
+            follower.update()
+
+            # Replaced by a file that's already longer than the old one
+            replacement_filename = os.path.join(dir, "replacement.txt")
+            with open(replacement_filename, "w") as file:
+                file.write("treb7uchet\n9\n")
+            os.replace(replacement_filename, filename)
+
+            follower.update()
+            self.assertEqual(follower.part1, 77 + 99)
+
+
+if __name__ == "__main__":
+    unittest.main()
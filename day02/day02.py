@@ -1,6 +1,15 @@
+import array
+import bisect
 import re
 import sys
 
+import numpy as np
+
+BAG = {"red": 12, "green": 13, "blue": 14}
+
+# Marks a color that never appeared in a game in GameTable.maxima
+NOT_SEEN = -1
+
 
 def parse_round(desc):
     result = {}
@@ -58,22 +67,294 @@ def power(game):
     return result
 
 
-def part1(lines):
-    games = (parse_game(line) for line in lines if line)
-    maxes = {"red": 12, "green": 13, "blue": 14}
+class Colors:
+    """
+    Colors interns color names to small integer IDs, which are used as the
+    column indices for per-game maxima. Sharing one Colors between several
+    GameTables keeps their columns lined up.
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        self._ids_by_bytes = {}
+        for name in names:
+            self.intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_of(self, name):
+        return self.ids.get(name)
+
+    def intern(self, name):
+        id = self.ids.get(name)
+        if id is None:
+            id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = id
+            self._ids_by_bytes[name.encode()] = id
+        return id
+
+    def intern_bytes(self, name):
+        id = self._ids_by_bytes.get(name)
+        if id is None:
+            id = self.intern(name.decode())
+        return id
+
+    def vector(self, counts, fill):
+        """
+        Converts a {color: count} dict into an array indexed by color ID.
+        Colors counts doesn't mention get fill, and colors that aren't in
+        the vocabulary are ignored.
+        """
+        result = np.full(len(self.names), fill, dtype=np.int64)
+        for name, count in counts.items():
+            id = self.ids.get(name)
+            if id is not None:
+                result[id] = count
+        return result
+
+
+def scan_games(lines, colors):
+    """
+    Tokenizes game records (str or bytes) without regexes or per-round dicts,
+    folding each cube count straight into the game's per-color maxima.
+    Yields (id, maxima) per game. maxima[color_id] is the most cubes seen of
+    that color, or NOT_SEEN, and is sized to the Colors vocabulary (which new
+    colors are interned into as they're found).
+    """
+    for line in lines:
+        if isinstance(line, str):
+            line = line.encode()
+
+        header, _, body = line.partition(b":")
+        header = header.split()
+        if len(header) != 2 or header[0] != b"Game":
+            continue
+
+        maxima = [NOT_SEEN] * len(colors)
+
+        # Rounds don't matter for the maxima, so treat every separator alike
+        tokens = body.replace(b",", b" ").replace(b";", b" ").split()
+
+        for count, color in zip(tokens[::2], tokens[1::2]):
+            color_id = colors.intern_bytes(color)
+            if color_id >= len(maxima):
+                maxima.extend([NOT_SEEN] * (color_id + 1 - len(maxima)))
+
+            count = int(count)
+            if count > maxima[color_id]:
+                maxima[color_id] = count
+
+        yield (int(header[1]), maxima)
+
+
+class GameTable:
+    """
+    GameTable reduces each game to a single row holding the most cubes of
+    each color seen in any of its rounds, with one column per color ID in
+    its Colors. Checking a bag or computing powers works on whole columns
+    at once rather than walking every round of every game, so the cost per
+    color is the same however many colors there are.
+    """
+
+    def __init__(self, ids, maxima, colors):
+        self.ids = ids
+        self.maxima = maxima
+        self.colors = colors
+
+    def limits_for(self, bag):
+        """
+        Converts a {color: count} bag into one limit per column. Colors the
+        bag doesn't mention are unconstrained. Colors interned after this
+        table was built have no column, since none of its games saw them.
+        """
+        limits = self.colors.vector(bag, np.iinfo(self.maxima.dtype).max)
+        return limits[: self.maxima.shape[1]]
+
+    def possible(self, bag):
+        """
+        Returns a boolean array saying which games are possible with bag.
+        """
+        return (self.maxima <= self.limits_for(bag)).all(axis=1)
+
+    def sum_possible_ids(self, bag):
+        return int(self.ids[self.possible(bag)].sum())
 
-    possible_games = (game for game in games if game_is_possible(game, maxes))
+    def powers(self):
+        """
+        Returns each game's power. With enough colors the products won't fit
+        in an int64, so when they might not they're worked out as Python ints
+        (in an object array) instead.
+        """
+        present = np.where(self.maxima == NOT_SEEN, 1, self.maxima)
+        if present.size > 0:
+            bits = np.log2(np.maximum(present, 1)).sum(axis=1)
+            if bits.max() >= 62:
+                return present.astype(object).prod(axis=1)
+        return present.prod(axis=1)
 
-    return sum(game["id"] for game in possible_games)
+    @staticmethod
+    def parse(lines, colors=None):
+        """
+        Builds a GameTable from game records (str or bytes) using scan_games.
+        Rows are packed into flat arrays as they're read; when a new color
+        shows up a new block is started, since earlier rows are narrower.
+        """
+        if colors is None:
+            colors = Colors()
+
+        ids = array.array("q")
+        blocks = []
+
+        for id, maxima in scan_games(lines, colors):
+            if len(blocks) == 0 or blocks[-1][0] != len(maxima):
+                blocks.append([len(maxima), 0, array.array("q")])
+            ids.append(id)
+            blocks[-1][1] += 1
+            blocks[-1][2].extend(maxima)
+
+        table_maxima = np.full((len(ids), len(colors)), NOT_SEEN, dtype=np.int64)
+        row = 0
+
+        for width, row_count, block in blocks:
+            block = np.frombuffer(block, dtype=np.int64).reshape(row_count, width)
+            table_maxima[row : row + row_count, :width] = block
+            row += row_count
+
+        return GameTable(np.frombuffer(ids, dtype=np.int64), table_maxima, colors)
+
+
+class FenwickTree2D:
+    """
+    A 2D Fenwick (binary indexed) tree supporting point additions and sums
+    over prefix rectangles, both in O(log rows * log columns).
+    """
+
+    def __init__(self, rows, columns):
+        self.tree = [[0] * (columns + 1) for _ in range(rows + 1)]
+
+    def add(self, row, column, value):
+        i = row + 1
+        while i < len(self.tree):
+            tree_row = self.tree[i]
+            j = column + 1
+            while j < len(tree_row):
+                tree_row[j] += value
+                j += j & -j
+            i += i & -i
+
+    def prefix_sum(self, rows, columns):
+        """
+        Returns the sum of everything in the first rows rows and first columns columns.
+        """
+        result = 0
+        i = rows
+        while i > 0:
+            tree_row = self.tree[i]
+            j = columns
+            while j > 0:
+                result += tree_row[j]
+                j -= j & -j
+            i -= i & -i
+        return result
+
+
+class DominanceIndex:
+    """
+    DominanceIndex answers batches of "what is the sum of the IDs of the
+    games possible with this bag?" for three colors of a GameTable.
+
+    Each color's maxima are ranked among their distinct values and games
+    with the same ranks are merged into one weighted point. A batch of bags
+    is answered by sweeping through them in order of their first color's
+    limit, adding points to a 2D Fenwick tree over the other two colors once
+    their first color fits, so each bag costs one prefix sum.
+    """
+
+    def __init__(self, table, colors=("red", "green", "blue")):
+        self.table = table
+        self.index_colors = colors
+        self.values = []
+        ranks = []
+
+        for color in colors:
+            column = table.colors.id_of(color)
+            if column is None or column >= table.maxima.shape[1]:
+                maxima = np.full(len(table.ids), NOT_SEEN, dtype=np.int64)
+            else:
+                maxima = table.maxima[:, column]
+            values, inverse = np.unique(maxima, return_inverse=True)
+            self.values.append(values.tolist())
+            ranks.append(inverse.reshape(-1))
+
+        sizes = [len(values) for values in self.values]
+        keys = (ranks[0] * sizes[1] + ranks[1]) * sizes[2] + ranks[2]
+        keys, inverse = np.unique(keys, return_inverse=True)
+        weights = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(weights, inverse.reshape(-1), table.ids)
+
+        # Keys sort by the first color's rank, so points come out in sweep order
+        self.points = list(
+            zip(
+                (keys // (sizes[1] * sizes[2])).tolist(),
+                (keys // sizes[2] % sizes[1]).tolist(),
+                (keys % sizes[2]).tolist(),
+                weights.tolist(),
+            )
+        )
+
+    def prefix_lengths(self, bag):
+        """
+        Converts a bag into, for each indexed color, how many of that color's
+        distinct values fit in the bag.
+        """
+        for color in bag:
+            indexed = color in self.index_colors
+            if not indexed and self.table.colors.id_of(color) is not None:
+                raise Exception(f"Color {repr(color)} is not part of this index")
+
+        lengths = []
+        for color, values in zip(self.index_colors, self.values):
+            if color in bag:
+                lengths.append(bisect.bisect_right(values, bag[color]))
+            else:
+                lengths.append(len(values))
+        return lengths
+
+    def sums_of_possible_ids(self, bags):
+        """
+        Returns the sum of the IDs of the possible games for each bag in bags.
+        """
+        queries = sorted(
+            (self.prefix_lengths(bag) + [index] for index, bag in enumerate(bags)),
+        )
+        tree = FenwickTree2D(len(self.values[1]), len(self.values[2]))
+        results = [0] * len(queries)
+        next_point = 0
+
+        for first, second, third, index in queries:
+            while next_point < len(self.points) and self.points[next_point][0] < first:
+                _, row, column, weight = self.points[next_point]
+                tree.add(row, column, weight)
+                next_point += 1
+            results[index] = tree.prefix_sum(second, third)
+
+        return results
+
+
+def part1(lines):
+    return GameTable.parse(lines).sum_possible_ids(BAG)
 
 
 def part2(lines):
-    games = [parse_game(line) for line in lines if line]
-    powers = [power(game) for game in games]
-    return sum(powers)
+    # Summed as Python ints, since the total can overflow even when each
+    # power fits
+    return sum(GameTable.parse(lines).powers().tolist())
 
 
 if __name__ == "__main__":
-    input = list(sys.stdin)
+    input = list(sys.stdin.buffer)
     print(part1(input))
     print(part2(input))
@@ -1,14 +1,21 @@
 import os
+import random
 import unittest
 
 from day02 import (
+    BAG,
+    Colors,
+    DominanceIndex,
+    GameTable,
     game_is_possible,
     min_cubes_required,
     parse_game,
+    power,
     parse_round,
     part2,
     part1,
     round_is_possible,
+    scan_games,
 )
 
 
@@ -77,6 +84,142 @@ class TestDay02(unittest.TestCase):
         with open(input_filename, "r") as input_file:
             self.assertEqual(part2(input_file.readlines()), 2286)
 
+    def test_game_table(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            lines = input_file.readlines()
+
+        table = GameTable.parse(lines)
+        games = [parse_game(line) for line in lines]
+
+        self.assertEqual(table.colors.names, ["blue", "red", "green"])
+        self.assertEqual(list(table.maxima[2]), [6, 20, 13])
+
+        bags = [
+            {"red": 12, "green": 13, "blue": 14},
+            {"red": 4, "green": 3},
+            {"blue": 1},
+            {"yellow": 0},
+        ]
+        for bag in bags:
+            expected = [game_is_possible(game, bag) for game in games]
+            self.assertEqual(list(table.possible(bag)), expected)
+
+        self.assertEqual(list(table.powers()), [power(game) for game in games])
+
+    def test_game_table_missing_colors(self):
+        table = GameTable.parse(["Game 7: 2 red; 0 blue", "Game 8: 3 green"])
+        self.assertEqual(list(table.powers()), [0, 3])
+        self.assertEqual(table.sum_possible_ids({"red": 1, "green": 5}), 8)
+
+    def test_scan_games(self):
+        colors = Colors(["red"])
+        lines = [
+            b"Game 3: 8 green, 6 blue, 20 red; 5 blue, 4 red, 13 green; 5 green, 1 red\n",
+            b"\n",
+            "Game 11:  2 red,3   blue;7 green",
+        ]
+        self.assertEqual(
+            list(scan_games(lines, colors)),
+            [(3, [20, 13, 6]), (11, [2, 7, 3])],
+        )
+        self.assertEqual(colors.names, ["red", "green", "blue"])
+
+    def test_game_table_many_colors(self):
+        rng = random.Random(1)
+        names = [f"color{i}" for i in range(40)]
+        lines = []
+        for id in range(1, 101):
+            rounds = []
+            for _ in range(rng.randint(1, 3)):
+                counts = rng.sample(names, rng.randint(1, 6))
+                rounds.append(", ".join(f"{rng.randint(1, 9)} {c}" for c in counts))
+            lines.append(f"Game {id}: {'; '.join(rounds)}")
+
+        colors = Colors(["color0"])
+        table = GameTable.parse(lines[:50], colors)
+        other_table = GameTable.parse(lines[50:], colors)
+        self.assertEqual(len(colors), 40)
+        self.assertEqual(other_table.maxima.shape, (50, 40))
+
+        games = [parse_game(line) for line in lines]
+        bag = {name: rng.randint(3, 9) for name in names[:30]}
+        possible = list(table.possible(bag)) + list(other_table.possible(bag))
+        self.assertEqual(possible, [game_is_possible(game, bag) for game in games])
+
+        powers = list(table.powers()) + list(other_table.powers())
+        self.assertEqual(powers, [power(game) for game in games])
+
+    def test_game_table_powers_overflow(self):
+        lines = [
+            "Game 1: " + ", ".join(f"20 c{i}" for i in range(30)),
+            "Game 2: " + ", ".join(f"{2**31} c{i}" for i in range(2)),
+            "Game 3: 3 c0; 4 c1",
+        ]
+        table = GameTable.parse(lines)
+        self.assertEqual(list(table.powers()), [20**30, 2**62, 12])
+        self.assertEqual(part2(lines), 20**30 + 2**62 + 12)
+
+        lines = [f"Game {id}: {2**31 - 1} red, {2**31 - 1} blue" for id in range(4)]
+        self.assertEqual(part2(lines), 4 * (2**31 - 1) ** 2)
+
+    def test_game_table_shared_colors_grow(self):
+        colors = Colors()
+        table = GameTable.parse(["Game 1: 3 red", "Game 2: 1 red, 5 green"], colors)
+        GameTable.parse(["Game 3: 4 blue"], colors)
+
+        self.assertEqual(table.sum_possible_ids({"blue": 1}), 3)
+        self.assertEqual(table.sum_possible_ids({"blue": 1, "red": 2}), 2)
+        index = DominanceIndex(table)
+        self.assertEqual(index.sums_of_possible_ids([{"blue": 1, "red": 2}]), [2])
+
+        # A single column used to broadcast against the longer limits
+        colors = Colors()
+        table = GameTable.parse(["Game 1: 3 red"], colors)
+        GameTable.parse(["Game 2: 4 blue"], colors)
+        self.assertEqual(table.sum_possible_ids({"blue": 1}), 1)
+
+    def test_game_table_games_without_cubes(self):
+        table = GameTable.parse(["Game 1:", "Game 2: 3 red", "Game 3: 1 blue"])
+        self.assertEqual(table.maxima.tolist(), [[-1, -1], [3, -1], [-1, 1]])
+
+    def test_game_table_parse_bytes(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "rb") as input_file:
+            table = GameTable.parse(input_file)
+
+        self.assertEqual(table.sum_possible_ids(BAG), 8)
+        self.assertEqual(int(table.powers().sum()), 2286)
+
+    def test_dominance_index(self):
+        rng = random.Random(0)
+        colors = ["red", "green", "blue"]
+        lines = []
+        for id in range(1, 301):
+            rounds = []
+            for _ in range(rng.randint(1, 4)):
+                counts = rng.sample(colors, rng.randint(1, 3))
+                rounds.append(", ".join(f"{rng.randint(0, 20)} {c}" for c in counts))
+            lines.append(f"Game {id}: {'; '.join(rounds)}")
+
+        table = GameTable.parse(lines)
+        index = DominanceIndex(table)
+
+        bags = [BAG, {}, {"red": -5}]
+        for _ in range(200):
+            bag_colors = rng.sample(colors, rng.randint(0, 3))
+            bags.append({color: rng.randint(0, 22) for color in bag_colors})
+
+        expected = [table.sum_possible_ids(bag) for bag in bags]
+        self.assertEqual(index.sums_of_possible_ids(bags), expected)
+
+    def test_dominance_index_unindexed_color(self):
+        table = GameTable.parse(["Game 1: 2 red, 1 yellow"])
+        index = DominanceIndex(table)
+        self.assertEqual(index.sums_of_possible_ids([{"purple": 0}]), [1])
+        with self.assertRaises(Exception):
+            index.sums_of_possible_ids([{"yellow": 0}])
+
 
 if __name__ == "__main__":
     unittest.main()
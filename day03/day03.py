@@ -1,12 +1,28 @@
+import concurrent.futures
+import math
+import os
+import re
 import sys
 
+import numpy as np
+
+NUMBER_PATTERN = re.compile(r"\d+")
+SYMBOL_PATTERN = re.compile(r"[^.\d]")
+
+ASCII_DOT = ord(".")
+ASCII_ZERO = ord("0")
+
 
 class PartNumber:
-    def __init__(self, number, x, y, adjacent_symbols=[]):
+    def __init__(self, number, x, y, adjacent_symbols=[], length=None):
         self.number = number
         self.x = x
         self.y = y
         self.adjacent_symbols = adjacent_symbols
+        self.length = len(str(number)) if length is None else length
+
+    def positions(self):
+        return ((self.x + dx, self.y) for dx in range(self.length))
 
 
 class Symbol:
@@ -30,124 +46,326 @@ class Symbol:
 
 
 class Schematic:
+    """
+    Schematic holds the grid of a schematic along with a spatial index of
+    every symbol and every number (part number or not) by the cells they
+    cover, so point queries are O(1). set_char() edits a single cell and
+    only revisits the numbers and symbols around it, keeping the part
+    number and gear ratio sums up to date as it goes.
+    """
+
     def __init__(self):
-        self.part_numbers = []
+        self.rows = []
         self.symbols_by_position = {}
+        self.numbers_by_position = {}
+        self.part_number_sum = 0
+        self.gear_ratio_sum = 0
 
-    def add_part_number(self, part_number):
-        self.part_numbers.append(part_number)
-
-    def add_symbol(self, char, x, y):
-        pos = (x, y)
-        existing = self.symbols_by_position.get(pos)
-        if existing is not None:
-            if existing.char == char:
-                return existing
-            else:
-                raise Exception(f"Symbol already exists at {pos}")
-        symbol = Symbol(char, x, y)
-        self.symbols_by_position[pos] = symbol
-        return symbol
+    @property
+    def part_numbers(self):
+        numbers = set(self.numbers_by_position.values())
+        part_numbers = (n for n in numbers if len(n.adjacent_symbols) > 0)
+        return sorted(part_numbers, key=lambda n: (n.y, n.x))
 
     def symbol_at(self, x, y):
-        self.symbols_by_position.get((x, y))
+        return self.symbols_by_position.get((x, y))
+
+    def number_at(self, x, y):
+        return self.numbers_by_position.get((x, y))
 
     def symbols(self):
         return self.symbols_by_position.values()
 
-    @staticmethod
-    def parse(lines):
-        lines = [line.strip() for line in lines]
-        lines = [line for line in lines if line != ""]
-
-        schematic = Schematic()
+    def gears(self):
+        return (s for s in self.symbols() if s.is_gear())
 
-        number_chars = []
-        adjacent_symbols = set()
-        number_start_x = None
-        number_start_y = None
+    def char_at(self, x, y):
+        if y < 0 or y >= len(self.rows) or x < 0 or x >= len(self.rows[y]):
+            return "."
+        return self.rows[y][x]
 
-        def find_adjacent_symbols(x, y):
+    def numbers_near(self, x, y):
+        """
+        Returns the numbers with a digit in one of the 8 cells around (x, y).
+        """
+        numbers = []
+        for dy in (-1, 0, 1):
             for dx in (-1, 0, 1):
-                for dy in (-1, 0, 1):
-                    if dx == 0 and dy == 0:
-                        continue
-
-                    symbol_x = x + dx
-                    symbol_y = y + dy
-
-                    if symbol_x < 0 or symbol_y < 0 or symbol_y >= len(lines):
-                        continue
-
-                    line = lines[symbol_y]
-
-                    if symbol_x >= len(line):
-                        continue
-
-                    c = line[symbol_x]
-
-                    if Symbol.is_symbol_char(c):
-                        symbol = schematic.add_symbol(c, symbol_x, symbol_y)
-                        adjacent_symbols.add(symbol)
-
-        def finish_number():
-            nonlocal number_start_x, number_start_y
-
-            if len(number_chars) == 0:
-                number_start_x = None
-                number_start_y = None
-                adjacent_symbols.clear()
-                return
-
-            if len(adjacent_symbols) == 0:
-                number_start_x = None
-                number_start_y = None
-                number_chars.clear()
-                return
-
-            part_number = PartNumber(
-                int("".join(number_chars)),
-                number_start_x,
-                number_start_y,
-                adjacent_symbols,
-            )
+                number = self.numbers_by_position.get((x + dx, y + dy))
+                if number is not None and number not in numbers and (dx or dy):
+                    numbers.append(number)
+        return numbers
+
+    def set_char(self, x, y, c):
+        """
+        Changes the character at (x, y), updating only the numbers and
+        symbols that touch it.
+        """
+        if len(c) != 1 or c == "\n":
+            raise Exception(f"Invalid schematic character: {repr(c)}")
+        if x < 0 or y < 0:
+            raise Exception(f"Position ({x}, {y}) is outside the schematic")
+
+        old_c = self.char_at(x, y)
+        if old_c == c:
+            return
+
+        symbol = self.symbol_at(x, y)
+        if symbol is not None:
+            self._remove_symbol(symbol)
+
+        # The number here (if any) changes, and the numbers on either side
+        # might join up with it or each other
+        affected = []
+        for dx in (-1, 0, 1):
+            number = self.number_at(x + dx, y)
+            if number is not None and number not in affected:
+                affected.append(number)
+
+        rescan = {(x, y)}
+        for number in affected:
+            rescan.update(number.positions())
+            self._remove_number(number)
+
+        while len(self.rows) <= y:
+            self.rows.append([])
+        row = self.rows[y]
+        if len(row) <= x:
+            row.extend("." * (x + 1 - len(row)))
+        row[x] = c
+
+        for rescan_x, rescan_y in sorted(rescan):
+            if self.number_at(rescan_x, rescan_y) is None:
+                self._add_number_at(rescan_x, rescan_y)
+
+        if Symbol.is_symbol_char(c):
+            self._add_symbol(c, x, y)
+
+    def _gear_ratio(self, symbol):
+        if not symbol.is_gear():
+            return 0
+        first, second = symbol.adjacent_part_numbers
+        return first.number * second.number
+
+    def _link(self, number, symbol):
+        ratio = self._gear_ratio(symbol)
+        if len(number.adjacent_symbols) == 0:
+            self.part_number_sum += number.number
+        number.adjacent_symbols.append(symbol)
+        symbol.add_part_number(number)
+        self.gear_ratio_sum += self._gear_ratio(symbol) - ratio
+
+    def _unlink(self, number, symbol):
+        ratio = self._gear_ratio(symbol)
+        number.adjacent_symbols.remove(symbol)
+        symbol.adjacent_part_numbers.remove(number)
+        if len(number.adjacent_symbols) == 0:
+            self.part_number_sum -= number.number
+        self.gear_ratio_sum += self._gear_ratio(symbol) - ratio
+
+    def _add_symbol(self, char, x, y):
+        symbol = Symbol(char, x, y)
+        self.symbols_by_position[(x, y)] = symbol
+        for number in self.numbers_near(x, y):
+            self._link(number, symbol)
+        return symbol
 
-            for s in part_number.adjacent_symbols:
-                s.add_part_number(part_number)
+    def _remove_symbol(self, symbol):
+        for number in list(symbol.adjacent_part_numbers):
+            self._unlink(number, symbol)
+        del self.symbols_by_position[(symbol.x, symbol.y)]
+
+    def _add_number_at(self, x, y):
+        """
+        Indexes the number with a digit at (x, y), if there is one.
+        """
+        if not self.char_at(x, y).isdigit():
+            return None
+
+        row = self.rows[y]
+        start = x
+        while start > 0 and row[start - 1].isdigit():
+            start -= 1
+        stop = x + 1
+        while stop < len(row) and row[stop].isdigit():
+            stop += 1
+
+        number = PartNumber(int("".join(row[start:stop])), start, y, [], stop - start)
+        for position in number.positions():
+            self.numbers_by_position[position] = number
+
+        for neighbor_y in (y - 1, y, y + 1):
+            for neighbor_x in range(start - 1, stop + 1):
+                symbol = self.symbol_at(neighbor_x, neighbor_y)
+                if symbol is not None:
+                    self._link(number, symbol)
+
+        return number
+
+    def _remove_number(self, number):
+        for symbol in list(number.adjacent_symbols):
+            self._unlink(number, symbol)
+        for position in number.positions():
+            del self.numbers_by_position[position]
 
-            schematic.add_part_number(part_number)
+    @staticmethod
+    def parse(lines, jobs=None, band_height=None):
+        """
+        Parses a schematic. If jobs is given, the rows are split into bands
+        of band_height rows that are parsed by that many processes (0 for
+        one per CPU) and then stitched back together.
+        """
+        lines = [line.strip() for line in lines]
+        lines = [line for line in lines if line != ""]
 
-            number_chars.clear()
-            adjacent_symbols.clear()
-            number_start_x = None
-            number_start_y = None
+        schematic = Schematic()
+        schematic.rows = [list(line) for line in lines]
+
+        if jobs is None:
+            bands = [parse_band(lines, 0, "", "")]
+        else:
+            jobs = jobs or os.cpu_count()
+            if band_height is None:
+                # Rows vary in how many numbers and symbols they hold, so bands
+                # are kept small enough to hand each worker a few of them
+                band_height = max(1, math.ceil(len(lines) / (jobs * 4)))
+
+            starts = range(0, len(lines), band_height)
+            stops = [min(start + band_height, len(lines)) for start in starts]
+
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                bands = list(
+                    executor.map(
+                        parse_band,
+                        [lines[start:stop] for start, stop in zip(starts, stops)],
+                        starts,
+                        [lines[start - 1] if start > 0 else "" for start in starts],
+                        [lines[stop] if stop < len(lines) else "" for stop in stops],
+                    )
+                )
+
+        # Numbers can touch symbols in neighboring bands, so every band's
+        # symbols need to be in place before any numbers are linked up
+        for symbols, _ in bands:
+            for char, x, y in symbols:
+                schematic.symbols_by_position[(x, y)] = Symbol(char, x, y)
+
+        for _, numbers in bands:
+            for number, x, y, length, adjacent in numbers:
+                part_number = PartNumber(number, x, y, [], length)
+                for position in part_number.positions():
+                    schematic.numbers_by_position[position] = part_number
+                for position in adjacent:
+                    schematic._link(
+                        part_number, schematic.symbols_by_position[position]
+                    )
 
-        for y, line in enumerate(lines):
-            for x, c in enumerate(line):
-                match (c):
-                    case d if d.isdigit():
-                        if len(number_chars) == 0:
-                            number_start_x = x
-                            number_start_y = y
-                        number_chars.append(d)
-                        find_adjacent_symbols(x, y)
-                    case _:
-                        finish_number()
+        return schematic
 
-            finish_number()
 
-        return schematic
+def parse_band(rows, y, above, below):
+    """
+    Parses a band of rows from a schematic, the first of which is row y.
+    above and below are the rows just outside the band ("" if there are
+    none); they're only used to find symbols next to numbers in the band.
+    Every number belongs to exactly one band, so bands never report the same
+    number twice. Returns a tuple of (symbols, numbers):
+    - symbols: (char, x, y) for each symbol in the band
+    - numbers: (number, x, y, length, adjacent) for each number in the band,
+      where adjacent lists the (x, y) positions of its adjacent symbols
+    """
+    symbols = []
+    numbers = []
+    window = [above] + list(rows) + [below]
+
+    for index, row in enumerate(rows):
+        row_y = y + index
+
+        for m in SYMBOL_PATTERN.finditer(row):
+            symbols.append((m.group(), m.start(), row_y))
+
+        for m in NUMBER_PATTERN.finditer(row):
+            start = max(m.start() - 1, 0)
+            stop = m.end() + 1
+            adjacent = []
+
+            for dy in (-1, 0, 1):
+                neighbor_row = window[index + 1 + dy]
+                for symbol in SYMBOL_PATTERN.finditer(neighbor_row, start, stop):
+                    adjacent.append((symbol.start(), row_y + dy))
+
+            numbers.append((int(m.group()), m.start(), row_y, len(m.group()), adjacent))
+
+    return (symbols, numbers)
+
+
+def scan_schematic(lines):
+    """
+    Streams through a schematic holding only three rows at a time, checking
+    each number's bounding box once rather than once per digit.
+    Yields each PartNumber as soon as the row below it has been read, and
+    each "*" Symbol touching at least one part number (along with those
+    part numbers) once no more part numbers can reach it. Part numbers
+    yielded here don't track their adjacent symbols.
+    """
+    rows = (line.strip() for line in lines)
+    rows = (row for row in rows if row != "")
+
+    # Row -> x -> "*" Symbol, only ever holding the rows around the current one
+    stars = {}
+
+    def scan_row(above, row, below, y):
+        for m in NUMBER_PATTERN.finditer(row):
+            start = max(m.start() - 1, 0)
+            stop = m.end() + 1
+            neighbors = ((above, y - 1), (row, y), (below, y + 1))
+
+            if not any(SYMBOL_PATTERN.search(r, start, stop) for r, _ in neighbors):
+                continue
+
+            part_number = PartNumber(int(m.group()), m.start(), y, ())
+
+            for r, star_y in neighbors:
+                x = r.find("*", start, stop)
+                while x >= 0:
+                    star = stars.setdefault(star_y, {}).get(x)
+                    if star is None:
+                        star = Symbol("*", x, star_y)
+                        stars[star_y][x] = star
+                    star.add_part_number(part_number)
+                    x = r.find("*", x + 1, stop)
+
+            yield part_number
+
+    def finish_stars(y):
+        yield from stars.pop(y, {}).values()
+
+    above = ""
+    row = None
+    y = 0
+
+    for below in rows:
+        if row is not None:
+            yield from scan_row(above, row, below, y)
+            yield from finish_stars(y - 1)
+            above = row
+            y += 1
+        row = below
+
+    if row is not None:
+        yield from scan_row(above, row, "", y)
+        yield from finish_stars(y - 1)
+        yield from finish_stars(y)
 
 
 def part1(lines):
-    schematic = Schematic.parse(lines)
-    return sum(p.number for p in schematic.part_numbers)
+    items = scan_schematic(lines)
+    return sum(item.number for item in items if isinstance(item, PartNumber))
 
 
 def part2(lines):
-    schematic = Schematic.parse(lines)
-
-    gears = (s for s in schematic.symbols() if s.is_gear())
+    items = scan_schematic(lines)
+    gears = (item for item in items if isinstance(item, Symbol) and item.is_gear())
 
     gear_ratios = []
     for g in gears:
@@ -159,6 +377,66 @@ def part2(lines):
     return sum(gear_ratios)
 
 
+def load_grid(lines):
+    """
+    Loads a schematic as a 2D uint8 array of its characters. Short rows are
+    padded with "." on the right, and an extra column of "." is added so
+    that no run of digits continues from one row onto the next.
+    """
+    rows = (line.strip() for line in lines)
+    rows = [row for row in rows if row != ""]
+
+    if len(rows) == 0:
+        return np.zeros((0, 1), dtype=np.uint8)
+
+    width = max(len(row) for row in rows) + 1
+    data = "".join(row.ljust(width, ".") for row in rows).encode()
+
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(rows), width)
+
+
+def part1_numpy(lines):
+    """
+    Vectorized part1. Symbols are turned into a mask, dilated by one cell in
+    every direction, and each run of digits that overlaps the dilated mask
+    is a part number.
+    """
+    grid = load_grid(lines)
+    height, width = grid.shape
+
+    # digits holds each cell's digit value, which is also used to add up the
+    # part numbers below. The grid is uint8, so "." and any symbols below "0"
+    # wrap around to large values, and only digit cells land in 0-9
+    digits = grid - ASCII_ZERO
+    is_digit = digits < 10
+    is_symbol = ~is_digit & (grid != ASCII_DOT)
+
+    padded = np.pad(is_symbol, 1)
+    near_symbol = np.zeros_like(is_symbol)
+    for dy in range(3):
+        for dx in range(3):
+            near_symbol |= padded[dy : dy + height, dx : dx + width]
+
+    digit_offsets = np.flatnonzero(is_digit)
+    if len(digit_offsets) == 0:
+        return 0
+
+    # Digit runs are contiguous in the flattened grid thanks to the padding
+    # column, so a new run starts wherever the offsets jump
+    run_starts = np.flatnonzero(np.diff(digit_offsets, prepend=-2) != 1)
+    run_ends = np.append(run_starts[1:], len(digit_offsets)) - 1
+    run_lengths = run_ends - run_starts + 1
+
+    # Each digit's place value depends on how far it is from the end of its run
+    places = np.repeat(digit_offsets[run_ends], run_lengths) - digit_offsets
+    values = digits.ravel()[digit_offsets].astype(np.int64) * 10**places
+
+    numbers = np.add.reduceat(values, run_starts)
+    is_part = np.logical_or.reduceat(near_symbol.ravel()[digit_offsets], run_starts)
+
+    return int(numbers[is_part].sum())
+
+
 if __name__ == "__main__":
     input = list(sys.stdin)
     print(part1(input))
@@ -1,7 +1,22 @@
 import os
+import random
 import unittest
 
-from day03 import part1, part2
+from day03 import (
+    PartNumber,
+    Schematic,
+    Symbol,
+    part1,
+    part1_numpy,
+    part2,
+    scan_schematic,
+)
+
+
+def random_schematic(width, height, seed=0):
+    rng = random.Random(seed)
+    chars = "." * 12 + "0123456789" + "**#$+-"
+    return ["".join(rng.choice(chars) for _ in range(width)) for _ in range(height)]
 
 
 class TestDay03(unittest.TestCase):
@@ -41,6 +56,117 @@ class TestDay03(unittest.TestCase):
         with open(input_filename, "r") as input_file:
             self.assertEqual(part2(input_file.readlines()), 467835)
 
+    def test_scan_schematic_matches_parse(self):
+        for seed in range(5):
+            lines = random_schematic(30, 20, seed)
+            schematic = Schematic.parse(lines)
+            items = list(scan_schematic(lines))
+
+            self.assertEqual(
+                sorted((p.number, p.x, p.y) for p in schematic.part_numbers),
+                sorted(
+                    (i.number, i.x, i.y) for i in items if isinstance(i, PartNumber)
+                ),
+            )
+
+            expected_stars = sorted(
+                (s.x, s.y, sorted(p.number for p in s.adjacent_part_numbers))
+                for s in schematic.symbols()
+                if s.char == "*" and len(s.adjacent_part_numbers) > 0
+            )
+            actual_stars = sorted(
+                (i.x, i.y, sorted(p.number for p in i.adjacent_part_numbers))
+                for i in items
+                if isinstance(i, Symbol)
+            )
+            self.assertEqual(expected_stars, actual_stars)
+
+    def test_part1_numpy(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            self.assertEqual(part1_numpy(input_file.readlines()), 4361)
+
+        self.assertEqual(part1_numpy(["434..-49.", "....$90.."]), 139)
+        self.assertEqual(part1_numpy(["12", "+", "", "3.", "...4"]), 15)
+        self.assertEqual(part1_numpy([]), 0)
+
+        for seed in range(5):
+            lines = random_schematic(40, 25, seed)
+            self.assertEqual(part1_numpy(lines), part1(lines))
+
+    def test_schematic_point_queries(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            schematic = Schematic.parse(input_file.readlines())
+
+        self.assertEqual(schematic.symbol_at(3, 1).char, "*")
+        self.assertIsNone(schematic.symbol_at(0, 0))
+        self.assertEqual(schematic.number_at(1, 0).number, 467)
+        self.assertIsNone(schematic.number_at(3, 0))
+        self.assertEqual(
+            sorted(n.number for n in schematic.numbers_near(3, 1)), [35, 467]
+        )
+        self.assertEqual(schematic.part_number_sum, 4361)
+        self.assertEqual(schematic.gear_ratio_sum, 467835)
+
+    def test_schematic_set_char(self):
+        rng = random.Random(0)
+        lines = random_schematic(20, 15, seed=7)
+        schematic = Schematic.parse(lines)
+        grid = [list(line) for line in lines]
+
+        for _ in range(300):
+            x = rng.randrange(20)
+            y = rng.randrange(15)
+            c = rng.choice(".....0123456789*#")
+            schematic.set_char(x, y, c)
+            grid[y][x] = c
+
+            edited = ["".join(row) for row in grid]
+            self.assertEqual(schematic.part_number_sum, part1(edited))
+            self.assertEqual(schematic.gear_ratio_sum, part2(edited))
+
+        expected = Schematic.parse(edited)
+        self.assertEqual(
+            [(p.number, p.x, p.y) for p in expected.part_numbers],
+            [(p.number, p.x, p.y) for p in schematic.part_numbers],
+        )
+
+    def test_schematic_set_char_grows_grid(self):
+        schematic = Schematic.parse(["12"])
+        schematic.set_char(4, 1, "#")
+        self.assertEqual(schematic.part_number_sum, 0)
+        schematic.set_char(2, 0, "3")
+        schematic.set_char(3, 0, "4")
+        self.assertEqual(schematic.part_number_sum, 1234)
+        schematic.set_char(1, 0, ".")
+        self.assertEqual(schematic.part_number_sum, 34)
+
+        for x, y in [(-1, 0), (0, -1)]:
+            with self.assertRaises(Exception):
+                schematic.set_char(x, y, "#")
+        self.assertEqual(schematic.char_at(4, 0), ".")
+        self.assertEqual(schematic.symbols_by_position.keys(), {(4, 1)})
+
+    def test_schematic_parse_in_bands(self):
+        def summarize(schematic):
+            return (
+                [(p.number, p.x, p.y) for p in schematic.part_numbers],
+                sorted(
+                    (s.x, s.y, sorted(p.number for p in s.adjacent_part_numbers))
+                    for s in schematic.symbols()
+                ),
+                schematic.part_number_sum,
+                schematic.gear_ratio_sum,
+            )
+
+        lines = random_schematic(30, 40, seed=3)
+        expected = summarize(Schematic.parse(lines))
+
+        for band_height in (1, 2, 7, None):
+            schematic = Schematic.parse(lines, jobs=2, band_height=band_height)
+            self.assertEqual(summarize(schematic), expected)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,63 +1,263 @@
+import collections
 import re
 import sys
 
+import numpy as np
 
-def parse_card(spec):
+ASCII_BAR = ord("|")
+ASCII_COLON = ord(":")
+ASCII_SPACE = ord(" ")
+
+VALUE_PATTERN = re.compile(rb"\d+")
+
+# How many cards to compare at once in match_counts, to bound memory
+MATCH_CHUNK_SIZE = 65536
+
+
+def to_mask(values):
+    """
+    Encodes a string of space-separated non-negative integers as a bitmask
+    with bit n set for each value n.
+    """
+    mask = 0
+    for value in values.split():
+        mask |= 1 << int(value)
+    return mask
+
+
+def parse_card_masks(spec):
+    """
+    Parses a card into (card_index, winners, numbers), where winners and
+    numbers are bitmasks (see to_mask).
+    """
     spec = re.sub(r"\s+", " ", spec).strip()
     m = re.match(r"Card (\d+): (.+)\|(.+)", spec)
 
     if m is None:
         raise Exception(f"Could not parse spec: #{repr(spec)}")
 
-    card_index = int(m.group(1))
-    winners = set(int(value.strip()) for value in m.group(2).split(" ") if value != "")
-    numbers = set(int(value.strip()) for value in m.group(3).split(" ") if value != "")
-    winning_number_count = len(winners & numbers)
+    return (int(m.group(1)), to_mask(m.group(2)), to_mask(m.group(3)))
+
+
+def parse_card(spec):
+    card_index, winners, numbers = parse_card_masks(spec)
+    winning_number_count = (winners & numbers).bit_count()
 
     return (card_index, winning_number_count)
 
 
-def part1(lines):
-    lines = (line.strip() for line in lines)
-    lines = [line for line in lines if line != ""]
+class CardParser:
+    """
+    CardParser parses card lines (str or bytes) into the same tuples as
+    parse_card_masks. Cards are printed in fixed-width columns, so the layout
+    is learned from the first line and the values of later lines are sliced
+    straight out of the raw bytes. Lines that don't fit the layout go
+    through parse_card_masks instead.
+    """
+
+    def __init__(self):
+        self.layout = None
+        self.detected = False
+
+    @staticmethod
+    def detect_layout(line):
+        """
+        Returns (length, colon, bar, winner_slices, number_slices) for a card
+        line as bytes, or None if it doesn't look like a card. Each slice runs
+        from the end of the value before it, so it covers the value's padding.
+        """
+        colon = line.find(b":")
+        bar = line.find(b"|", colon + 1)
+        if not line.startswith(b"Card") or colon < 0 or bar < 0:
+            return None
+
+        def value_slices(start, stop):
+            slices = []
+            for m in VALUE_PATTERN.finditer(line, start, stop):
+                slices.append((start, m.end()))
+                start = m.end()
+            return slices
+
+        return (
+            len(line),
+            colon,
+            bar,
+            value_slices(colon + 1, bar),
+            value_slices(bar + 1, len(line)),
+        )
+
+    def parse_masks(self, line):
+        if isinstance(line, str):
+            line = line.encode()
+        line = line.rstrip()
+
+        if not self.detected:
+            self.layout = CardParser.detect_layout(line)
+            self.detected = True
+
+        if self.layout is not None:
+            length, colon, bar, winner_slices, number_slices = self.layout
+            winners_stop = winner_slices[-1][1] if winner_slices else colon + 1
+            numbers_stop = number_slices[-1][1] if number_slices else bar + 1
+
+            def blank(start, stop):
+                return line[start:stop].strip(b" ") == b""
+
+            # Each value has to start and end exactly where its slot does, and
+            # there can't be anything between the slots, or a differently
+            # spaced line could be sliced mid-value or lose values
+            fits = (
+                len(line) == length
+                and line[colon] == ASCII_COLON
+                and line[bar] == ASCII_BAR
+                and line.startswith(b"Card ")
+                and line[4:colon].lstrip(b" ").isdigit()
+                and blank(winners_stop, bar)
+                and blank(numbers_stop, length)
+                and all(
+                    line[start] == ASCII_SPACE
+                    and (stop == length or line[stop] == ASCII_SPACE)
+                    for start, stop in winner_slices + number_slices
+                )
+            )
+            if fits:
+                try:
+                    winners = 0
+                    for start, stop in winner_slices:
+                        winners |= 1 << int(line[start:stop])
+
+                    numbers = 0
+                    for start, stop in number_slices:
+                        numbers |= 1 << int(line[start:stop])
+
+                    return (int(line[4:colon]), winners, numbers)
+                except ValueError:
+                    # Something other than a number where one should be
+                    pass
 
+        return parse_card_masks(line.decode())
+
+    def parse(self, line):
+        card_index, winners, numbers = self.parse_masks(line)
+        return (card_index, (winners & numbers).bit_count())
+
+
+def part1(lines):
+    parser = CardParser()
     total_points = 0
 
     for line in lines:
-        _, winning_number_count = parse_card(line)
+        if not line.strip():
+            continue
+
+        _, winning_number_count = parser.parse(line)
         point_value = 2 ** (winning_number_count - 1) if winning_number_count > 0 else 0
         total_points += point_value
 
     return total_points
 
 
+def count_cards(winning_number_counts):
+    """
+    Counts how many scratchcards you end up with, given each card's number
+    of winning numbers in order. Cards are streamed through once, and the
+    only state kept is a window of copy counts that are about to stop
+    applying, which is never longer than the largest winning number count.
+    """
+    total = 0
+
+    # Copies of the current card won by earlier cards
+    won_copies = 0
+
+    # expiring[i] is how many of won_copies stop applying after i more cards
+    expiring = collections.deque()
+
+    for winning_number_count in winning_number_counts:
+        copies = 1 + won_copies
+        total += copies
+
+        if len(expiring) > 0:
+            won_copies -= expiring.popleft()
+
+        if winning_number_count > 0:
+            while len(expiring) < winning_number_count:
+                expiring.append(0)
+            expiring[winning_number_count - 1] += copies
+            won_copies += copies
+
+    return total
+
+
 def part2(lines):
-    lines = (line.strip() for line in lines)
-    lines = [line for line in lines if line != ""]
+    parser = CardParser()
+    lines = (line for line in lines if line.strip())
+    return count_cards(parser.parse(line)[1] for line in lines)
+
+
+def load_cards(lines):
+    """
+    Loads cards into a pair of 2D integer arrays, (winners, numbers), with
+    one row per card in order. Every card needs the same number of winners
+    and the same number of numbers.
+    """
+    winners = []
+    numbers = []
+
+    for line in lines:
+        _, _, values = line.partition(":")
+        if values == "":
+            continue
+        card_winners, _, card_numbers = values.partition("|")
+        winners.append(card_winners)
+        numbers.append(card_numbers)
+
+    def to_array(values):
+        widths = {len(card_values.split()) for card_values in values}
+        if len(widths) > 1:
+            raise Exception("Cards don't all have the same number of values")
+        width = widths.pop() if widths else 0
+
+        flat = np.fromstring(" ".join(values), dtype=np.int64, sep=" ")
+        if len(flat) != len(values) * width:
+            raise Exception("Cards have values that aren't numbers")
+        return flat.reshape(len(values), width)
+
+    return (to_array(winners), to_array(numbers))
+
 
-    cards = [parse_card(line) for line in lines]
-    counts = {}
+def match_counts(winners, numbers):
+    """
+    Counts the winning numbers on every card at once by comparing each
+    winner against each number. Repeated winners only count once.
+    """
+    result = np.zeros(len(winners), dtype=np.int64)
 
-    def count_for(card_index):
-        if card_index in counts:
-            return counts[card_index]
+    for start in range(0, len(winners), MATCH_CHUNK_SIZE):
+        stop = start + MATCH_CHUNK_SIZE
+        chunk_winners = np.sort(winners[start:stop], axis=1)
+        chunk_numbers = numbers[start:stop]
 
-        _, winning_number_count = cards[card_index - 1]
-        copies = cards[card_index : card_index + winning_number_count]
+        matched = (chunk_winners[:, :, None] == chunk_numbers[:, None, :]).any(axis=2)
+        matched[:, 1:] &= chunk_winners[:, 1:] != chunk_winners[:, :-1]
+        result[start:stop] = matched.sum(axis=1)
 
-        count = 1
+    return result
 
-        for copy_index, _ in copies:
-            count += count_for(copy_index)
 
-        counts[card_index] = count
+def part1_numpy(lines):
+    counts = match_counts(*load_cards(lines))
+    points = np.where(counts > 0, 1 << np.maximum(counts - 1, 0), 0)
+    return int(points.sum())
 
-        return counts[card_index]
 
-    return sum(count_for(card_index) for card_index, _ in cards)
+def part2_numpy(lines):
+    # Each card's copies depend on the ones before it, so this is a single
+    # running-sum pass over the precomputed match counts
+    counts = match_counts(*load_cards(lines))
+    return count_cards(counts.tolist())
 
 
 if __name__ == "__main__":
-    input = list(sys.stdin)
+    input = list(sys.stdin.buffer)
     print(part1(input))
     print(part2(input))
@@ -1,7 +1,19 @@
 import os
+import random
 import unittest
 
-from day04 import part1, part2
+from day04 import (
+    CardParser,
+    count_cards,
+    load_cards,
+    parse_card,
+    parse_card_masks,
+    part1,
+    part1_numpy,
+    part2,
+    part2_numpy,
+    to_mask,
+)
 
 
 class TestDay04(unittest.TestCase):
@@ -15,6 +27,97 @@ class TestDay04(unittest.TestCase):
         with open(input_filename, "r") as input_file:
             self.assertEqual(part2(input_file.readlines()), 30)
 
+    def test_to_mask(self):
+        self.assertEqual(to_mask(" 1  3 3 0"), 0b1011)
+        self.assertEqual(to_mask(""), 0)
+
+    def test_parse_card(self):
+        spec = "Card   3:  1 21 53 59 44 | 69 82 63 72 16 21 14  1"
+        card_index, winners, numbers = parse_card_masks(spec)
+        self.assertEqual(card_index, 3)
+        self.assertEqual(winners, to_mask("1 21 53 59 44"))
+        self.assertEqual(numbers, to_mask("69 82 63 72 16 21 14 1"))
+        self.assertEqual(parse_card(spec), (3, 2))
+
+    def test_card_parser(self):
+        lines = [
+            b"Card   1: 41 48 83 86 17 | 83 86  6 31 17  9 48 53\n",
+            "Card  12: 13 32 20 16 61 | 61 30 68 82 17 32 24 19",
+            b"Card 123: 13 32 20 16 61 | 61 30 68 82 17 32 24 19\r\n",
+            b"Card   4:  1 21 53 59 44 |  9 82 63 72 16 21 14 1 ",
+            b"Card 5: 1 21 53 59 44 | 69 82 63 72 16 21 14 100",
+            b"Card   6: 41 48 83 86 17 | 83 86  6 31 17  9 48 5x",
+        ]
+        parser = CardParser()
+
+        for line in lines[:-1]:
+            text = line.decode() if isinstance(line, bytes) else line
+            self.assertEqual(parser.parse_masks(line), parse_card_masks(text))
+
+        with self.assertRaises(ValueError):
+            parser.parse_masks(lines[-1])
+
+        self.assertEqual(parser.layout[0], len(lines[0].rstrip()))
+
+        # Same length as the layout, but the values sit in different places
+        parser = CardParser()
+        parser.parse_masks(b"Card 1: 10 20 | 5")
+        self.assertEqual(
+            parser.parse_masks(b"Card 1:  1020 | 5"),
+            parse_card_masks("Card 1:  1020 | 5"),
+        )
+
+        # A value in what was padding before the bar
+        parser = CardParser()
+        parser.parse(b"Card 1: 10 20  | 5")
+        self.assertEqual(parser.parse(b"Card 2: 10 20 7| 7"), (2, 1))
+        self.assertEqual(parser.parse(b"Card 3: 10 20  |20"), (3, 1))
+
+    def test_count_cards(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            counts = [rng.randint(0, 5) for _ in range(rng.randint(0, 40))]
+
+            copies = [1] * len(counts)
+            for index, count in enumerate(counts):
+                for won in range(index + 1, min(index + 1 + count, len(counts))):
+                    copies[won] += copies[index]
+
+            self.assertEqual(count_cards(counts), sum(copies))
+
+    def test_count_cards_long_chain(self):
+        # Every card wins a copy of the next, so card n ends up with n copies
+        n = 100_000
+        self.assertEqual(count_cards([1] * n), n * (n + 1) // 2)
+
+    def test_part1_numpy_and_part2_numpy(self):
+        input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
+        with open(input_filename, "r") as input_file:
+            lines = input_file.readlines()
+
+        self.assertEqual(part1_numpy(lines), 13)
+        self.assertEqual(part2_numpy(lines), 30)
+
+        rng = random.Random(1)
+        lines = []
+        for card_index in range(1, 201):
+            winners = " ".join(f"{rng.randint(1, 30):2}" for _ in range(5))
+            numbers = " ".join(f"{rng.randint(1, 30):2}" for _ in range(8))
+            lines.append(f"Card {card_index:3}: {winners} | {numbers}")
+
+        self.assertEqual(part1_numpy(lines), part1(lines))
+        self.assertEqual(part2_numpy(lines), part2(lines))
+        self.assertEqual(part1_numpy([]), 0)
+
+    def test_load_cards_ragged(self):
+        # 4 + 6 winners would fit two rows of 5 if only the total were checked
+        lines = ["Card 1: 1 2 3 4 | 5", "Card 2: 1 2 3 4 5 6 | 7"]
+        with self.assertRaises(Exception):
+            load_cards(lines)
+
+        with self.assertRaises(Exception):
+            load_cards(["Card 1: 1 x | 5"])
+
 
 if __name__ == "__main__":
     unittest.main()
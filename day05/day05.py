@@ -1,7 +1,12 @@
+import bisect
+import collections
+import itertools
 from enum import Enum
 import re
 import sys
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
 
 
 class MapEntry:
@@ -62,6 +67,9 @@ class MapEntry:
     def source(self) -> range:
         return self._source
 
+    def dest_offset(self) -> int:
+        return self._dest_offset
+
     def dest(self) -> range:
         return range(
             self._source.start + self._dest_offset,
@@ -69,88 +77,629 @@ class MapEntry:
         )
 
 
+class RangeSet:
+    """
+    RangeSet is a set of integers stored as sorted ranges that neither
+    overlap nor touch, so the same values are never covered twice.
+    """
+
+    def __init__(self, ranges: Iterable[range] = ()) -> None:
+        self.ranges: list[range] = RangeSet.normalize(ranges)
+
+    def __iter__(self) -> Iterator[range]:
+        return iter(self.ranges)
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RangeSet) and self.ranges == other.ranges
+
+    def __repr__(self) -> str:
+        return f"RangeSet({self.ranges})"
+
+    def min(self) -> int:
+        if len(self.ranges) == 0:
+            raise Exception("RangeSet is empty")
+        return self.ranges[0].start
+
+    @staticmethod
+    def normalize(ranges: Iterable[range]) -> list[range]:
+        """
+        Sorts ranges and merges any that overlap or are adjacent.
+        """
+        result: list[range] = []
+
+        for r in sorted((r for r in ranges if r), key=lambda r: r.start):
+            if len(result) > 0 and r.start <= result[-1].stop:
+                if r.stop > result[-1].stop:
+                    result[-1] = range(result[-1].start, r.stop)
+            else:
+                result.append(r)
+
+        return result
+
+
+class PiecewiseMap:
+    """
+    PiecewiseMap maps integers by runs that each shift their values by a
+    fixed offset. Values from starts[i] up to (but not including)
+    starts[i + 1] have offsets[i] added to them. Values before starts[0]
+    are left alone.
+    """
+
+    def __init__(self, starts: list[int], offsets: list[int]) -> None:
+        self.starts = starts
+        self.offsets = offsets
+        self._arrays: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+    def offset_at(self, value: int) -> int:
+        index = bisect.bisect_right(self.starts, value) - 1
+        return 0 if index < 0 else self.offsets[index]
+
+    def map(self, value: int) -> int:
+        return value + self.offset_at(value)
+
+    def map_array(self, values: np.ndarray) -> np.ndarray:
+        """
+        Maps a whole array of values at once, finding each one's run with
+        np.searchsorted.
+        """
+        if self._arrays is None:
+            starts = np.array(self.starts, dtype=np.int64)
+            # Index 0 is for values before the first run
+            offsets = np.array([0] + self.offsets, dtype=np.int64)
+            self._arrays = (starts, offsets)
+
+        starts, offsets = self._arrays
+        return values + offsets[np.searchsorted(starts, values, side="right")]
+
+    def runs(self) -> Iterator[tuple[Optional[int], Optional[int], int]]:
+        """
+        Yields (start, stop, offset) for every run, including the leading
+        run of unmapped values. start and stop are None where a run is
+        unbounded.
+        """
+        stops = self.starts + [None]
+        yield (None, stops[0], 0)
+        for start, stop, offset in zip(self.starts, stops[1:], self.offsets):
+            yield (start, stop, offset)
+
+    def map_range(self, r: range) -> list[range]:
+        """
+        Maps every value in r, returning one range per run that r crosses.
+        """
+        result: list[range] = []
+        start = r.start
+        index = bisect.bisect_right(self.starts, start) - 1
+
+        while start < r.stop:
+            stop = r.stop
+            if index + 1 < len(self.starts):
+                stop = min(stop, self.starts[index + 1])
+            offset = 0 if index < 0 else self.offsets[index]
+            result.append(range(start + offset, stop + offset))
+            start = stop
+            index += 1
+
+        return result
+
+    def then(self, other: "PiecewiseMap") -> "PiecewiseMap":
+        """
+        Returns the PiecewiseMap that applies this one and then other.
+        """
+
+        # The result's runs break wherever this map's do, and wherever a run's
+        # values cross one of other's breakpoints
+        points = set(self.starts)
+
+        for start, stop, offset in self.runs():
+            first = 0
+            if start is not None:
+                first = bisect.bisect_left(other.starts, start + offset)
+            last = len(other.starts)
+            if stop is not None:
+                last = bisect.bisect_left(other.starts, stop + offset)
+            points.update(s - offset for s in other.starts[first:last])
+
+        starts: list[int] = []
+        offsets: list[int] = []
+        previous_offset = 0
+
+        for point in sorted(points):
+            offset = self.offset_at(point)
+            offset += other.offset_at(point + offset)
+            if offset != previous_offset:
+                starts.append(point)
+                offsets.append(offset)
+                previous_offset = offset
+
+        return PiecewiseMap(starts, offsets)
+
+
 class Map:
     """
-    Map handles mapping source values to destination values
+    Map handles mapping source values to destination values. Its entries
+    are kept sorted by where their source ranges start, and are expected
+    not to overlap.
     """
 
     def __init__(self, source: str, destination: str):
         self.source = source
         self.destination = destination
         self.entries: list[MapEntry] = []
+        self._source_starts: list[int] = []
+        self._entries_by_dest: Optional[list[MapEntry]] = None
+        self._dest_stops: list[int] = []
+        self._piecewise: Optional[PiecewiseMap] = None
+        self._listeners: list[Callable[["Map"], None]] = []
+
+    def add_listener(self, listener: Callable[["Map"], None]):
+        """
+        Registers listener to be called with this map whenever an entry is
+        added, removed, or updated.
+        """
+        self._listeners.append(listener)
 
     def add(self, source_start: int, dest_start: int, length: int):
-        self.entries.append(
+        self._insert(source_start, dest_start, length)
+        self._changed()
+
+    def remove(self, source_start: int) -> MapEntry:
+        """
+        Removes the entry whose source range starts at source_start.
+        """
+        entry = self._delete(source_start)
+        self._changed()
+        return entry
+
+    def update(self, source_start: int, dest_start: int, length: int):
+        """
+        Replaces the entry whose source range starts at source_start. Listeners
+        only hear about the change once.
+        """
+        self._delete(source_start)
+        self._insert(source_start, dest_start, length)
+        self._changed()
+
+    def _insert(self, source_start: int, dest_start: int, length: int):
+        index = bisect.bisect_right(self._source_starts, source_start)
+        self._source_starts.insert(index, source_start)
+        self.entries.insert(
+            index,
             MapEntry(
                 range(source_start, source_start + length),
                 dest_start - source_start,
-            )
+            ),
         )
 
+    def _delete(self, source_start: int) -> MapEntry:
+        index = bisect.bisect_left(self._source_starts, source_start)
+        if index == len(self._source_starts) or (
+            self._source_starts[index] != source_start
+        ):
+            raise Exception(f"No entry starts at {source_start}")
+        del self._source_starts[index]
+        return self.entries.pop(index)
+
+    def _changed(self):
+        self._entries_by_dest = None
+        self._piecewise = None
+        for listener in self._listeners:
+            listener(self)
+
+    def map_value(self, value: int) -> int:
+        index = bisect.bisect_right(self._source_starts, value) - 1
+        if index >= 0 and value in self.entries[index].source():
+            return value + self.entries[index].dest_offset()
+        return value
+
+    def breakpoints(self) -> list[int]:
+        """
+        Returns the source values where the offset this map applies can
+        change, i.e. where each entry starts and stops.
+        """
+        points = set()
+        for e in self.entries:
+            points.add(e.source().start)
+            points.add(e.source().stop)
+        return sorted(points)
+
+    def unmapped(self, r: range) -> Iterator[range]:
+        """
+        Yields the parts of r that no entry covers (and so map to themselves).
+        """
+        start = r.start
+        index = max(bisect.bisect_right(self._source_starts, start) - 1, 0)
+
+        while start < r.stop and index < len(self.entries):
+            source = self.entries[index].source()
+            index += 1
+            if source.stop <= start:
+                continue
+            if source.start >= r.stop:
+                break
+            if start < source.start:
+                yield range(start, source.start)
+            start = source.stop
+
+        if start < r.stop:
+            yield range(start, r.stop)
+
+    def entries_by_dest(self) -> tuple[list[int], list[MapEntry]]:
+        """
+        Returns the entries sorted by where their destination ranges start,
+        along with the furthest stop of any destination range up to and
+        including each entry. Unlike source ranges, destination ranges may overlap, so an entry
+        covering a value can start well before the entry just ahead of it.
+        """
+        if self._entries_by_dest is None:
+            self._entries_by_dest = sorted(self.entries, key=lambda e: e.dest().start)
+            self._dest_stops = list(
+                itertools.accumulate(
+                    (e.dest().stop for e in self._entries_by_dest), max
+                )
+            )
+        return (self._dest_stops, self._entries_by_dest)
+
+    def inverse_trace(self, ranges: list[range]) -> list[range]:
+        """
+        inverse_trace interprets ranges as a set of destination values and
+        returns every source value that maps into them
+        """
+        dest_stops, entries = self.entries_by_dest()
+        result: list[range] = []
+
+        for r in ranges:
+            if not r:
+                continue
+
+            result.extend(self.unmapped(r))
+
+            # Every entry before this one stops at or before r.start
+            index = bisect.bisect_right(dest_stops, r.start)
+            while index < len(entries):
+                e = entries[index]
+                dest = e.dest()
+                index += 1
+                if dest.start >= r.stop:
+                    break
+                start = max(r.start, dest.start)
+                stop = min(r.stop, dest.stop)
+                if start < stop:
+                    offset = e.dest_offset()
+                    result.append(range(start - offset, stop - offset))
+
+        return result
+
+    def preimage(self, value: int) -> list[int]:
+        """
+        Returns every source value that maps to value.
+        """
+        return [r.start for r in self.inverse_trace([range(value, value + 1)])]
+
+    def piecewise(self) -> PiecewiseMap:
+        """
+        Returns this map as a PiecewiseMap, with runs for the gaps between
+        entries (which map values to themselves). The result is cached until
+        the map changes.
+        """
+        if self._piecewise is not None:
+            return self._piecewise
+
+        starts: list[int] = []
+        offsets: list[int] = []
+        previous_stop: Optional[int] = None
+
+        for e in self.entries:
+            source = e.source()
+            if previous_stop is not None and previous_stop < source.start:
+                starts.append(previous_stop)
+                offsets.append(0)
+            starts.append(source.start)
+            offsets.append(e.dest_offset())
+            previous_stop = source.stop
+
+        if previous_stop is not None:
+            starts.append(previous_stop)
+            offsets.append(0)
+
+        self._piecewise = PiecewiseMap(starts, offsets)
+        return self._piecewise
+
     def trace(self, ranges: list[range]) -> list[range]:
         """
         trace interprets ranges as a set of source values and returns the
-        corresponding set of destination values
+        corresponding set of destination values. Each range bisects to the
+        first entry that could overlap it, then walks forward over only the
+        entries it overlaps, passing through the gaps between them as-is.
         """
 
         result: list[range] = []
-        working_ranges = ranges.copy()
-
-        while len(working_ranges) > 0:
-            r = working_ranges.pop()
 
+        for r in ranges:
             if not r:
                 continue
 
-            unmapped_before: Optional[range] = None
-            mapped: Optional[range] = None
-            unmapped_after: Optional[range] = None
+            start = r.start
+            index = max(bisect.bisect_right(self._source_starts, start) - 1, 0)
 
-            for e in self.entries:
-                t = e.map_source_to_dest(r)
-                any_source_mapped = bool(t[1])
+            while start < r.stop and index < len(self.entries):
+                e = self.entries[index]
+                source = e.source()
+                index += 1
 
-                if any_source_mapped:
-                    unmapped_before, mapped, unmapped_after = t
+                if source.stop <= start:
+                    continue
+                if source.start >= r.stop:
                     break
 
-            if mapped:
-                result.append(mapped)
-                working_ranges.append(unmapped_before)
-                working_ranges.append(unmapped_after)
-            else:
-                result.append(r)
+                if start < source.start:
+                    result.append(range(start, source.start))
+                    start = source.start
+
+                stop = min(r.stop, source.stop)
+                offset = e.dest_offset()
+                result.append(range(start + offset, stop + offset))
+                start = stop
+
+            if start < r.stop:
+                result.append(range(start, r.stop))
 
         return result
 
 
+class ComposedPath:
+    """
+    ComposedPath caches what Almanac works out about a chain of maps: the
+    composition of every prefix of the chain, and the breakpoints of every
+    suffix. When one map changes, only the prefixes and suffixes that include
+    it are dropped, and they're rebuilt the next time they're asked for.
+    """
+
+    def __init__(self, maps: list[Map]):
+        self.maps = maps
+        # _prefixes[i] composes maps[0..i]
+        self._prefixes: list[PiecewiseMap] = []
+        # _suffixes[i] holds the breakpoints of maps[i..], in maps[i]'s source
+        # values. The last one is for the empty chain at the end.
+        self._suffixes: list[Optional[list[int]]] = [None] * len(maps) + [[]]
+
+    def invalidate(self, map: Map) -> bool:
+        """
+        Drops whatever depends on map, returning whether anything did.
+        """
+        indexes = [index for index, m in enumerate(self.maps) if m is map]
+        if not indexes:
+            return False
+
+        del self._prefixes[indexes[0] :]
+        for index in range(indexes[-1] + 1):
+            self._suffixes[index] = None
+
+        return True
+
+    def composed(self) -> PiecewiseMap:
+        if not self.maps:
+            return PiecewiseMap([], [])
+
+        while len(self._prefixes) < len(self.maps):
+            map = self.maps[len(self._prefixes)]
+            if self._prefixes:
+                self._prefixes.append(self._prefixes[-1].then(map.piecewise()))
+            else:
+                self._prefixes.append(map.piecewise())
+
+        return self._prefixes[-1]
+
+    def breakpoints(self) -> list[int]:
+        # Starting from the last map, each map's breakpoints are added and
+        # everything found so far is pulled back to its source values
+        for index in reversed(range(len(self.maps))):
+            if self._suffixes[index] is not None:
+                continue
+            map = self.maps[index]
+            points = {
+                p for point in self._suffixes[index + 1] for p in map.preimage(point)
+            }
+            points.update(map.breakpoints())
+            self._suffixes[index] = sorted(points)
+
+        return self._suffixes[0]
+
+
 class Almanac:
     def __init__(self, seeds: list[range], maps: list[Map]):
         self.seeds: list[range] = seeds
-        self.maps = maps
+        self.maps: list[Map] = []
+        self.maps_by_source: dict[str, list[Map]] = {}
+        self.maps_by_destination: dict[str, list[Map]] = {}
+        self._paths: dict[tuple[str, str], ComposedPath] = {}
+        self._seed_sets: dict[str, RangeSet] = {}
+        self._min_locations: dict[str, int] = {}
+
+        for map in maps:
+            self.add_map(map)
+
+    def add_map(self, map: Map):
+        self.maps.append(map)
+        self.maps_by_source.setdefault(map.source, []).append(map)
+        self.maps_by_destination.setdefault(map.destination, []).append(map)
+        map.add_listener(self._map_changed)
+
+        # A new map can open up shorter paths between categories
+        self._paths.clear()
+        self._refresh_min_locations()
+
+    def _map_changed(self, map: Map):
+        changed = False
+        for path in self._paths.values():
+            changed = path.invalidate(map) or changed
+
+        if changed:
+            self._refresh_min_locations()
+
+    def _composed_path(self, source: str, destination: str) -> ComposedPath:
+        key = (source, destination)
+        path = self._paths.get(key)
+        if path is None:
+            path = ComposedPath(self.path(source, destination))
+            self._paths[key] = path
+        return path
+
+    def register_seeds(self, name: str, seeds: Iterable[range]):
+        """
+        Registers a set of seeds whose lowest location is kept up to date as
+        maps change, so that min_location_for_registered can answer it
+        without searching again.
+        """
+        self._seed_sets[name] = RangeSet(seeds)
+        self._min_locations[name] = self.min_location_for_seeds(
+            self._seed_sets[name].ranges
+        )
+
+    def unregister_seeds(self, name: str):
+        del self._seed_sets[name]
+        del self._min_locations[name]
+
+    def min_location_for_registered(self, name: str) -> int:
+        return self._min_locations[name]
+
+    def _refresh_min_locations(self):
+        for name, seeds in self._seed_sets.items():
+            self._min_locations[name] = self.min_location_for_seeds(seeds.ranges)
 
     def map_from(self, thing: str) -> Optional[Map]:
-        for map in self.maps:
-            if map.source == thing:
-                return map
+        maps = self.maps_by_source.get(thing)
+        return maps[0] if maps else None
 
     def map_to(self, thing: str) -> Optional[Map]:
-        for map in self.maps:
-            if map.destination == thing:
-                return map
+        maps = self.maps_by_destination.get(thing)
+        return maps[0] if maps else None
+
+    def path(self, source: str, destination: str) -> list[Map]:
+        """
+        Finds the shortest chain of maps converting source to destination,
+        searching breadth-first through the categories.
+        """
+        came_from: dict[str, Optional[Map]] = {source: None}
+        queue = collections.deque([source])
+
+        while len(queue) > 0 and destination not in came_from:
+            thing = queue.popleft()
+            for map in self.maps_by_source.get(thing, []):
+                if map.destination not in came_from:
+                    came_from[map.destination] = map
+                    queue.append(map.destination)
+
+        if destination not in came_from:
+            raise Exception(f"No way to get from {source} to {destination}")
+
+        path: list[Map] = []
+        thing = destination
+        while came_from[thing] is not None:
+            path.append(came_from[thing])
+            thing = came_from[thing].source
+        path.reverse()
+
+        return path
 
     def min_location_for_seed(self, seed: range) -> int:
-        map = self.map_from("seed")
+        return self.min_location_for_seeds([seed])
+
+    def min_location_for_seeds(self, seeds: list[range]) -> int:
+        """
+        Finds the lowest location for any of the given seeds. Within the
+        stretch between two breakpoints, locations rise one for one with
+        seeds, so the lowest location is always at the start of a seed range
+        or at one of the breakpoints inside it. Only those are tested.
+        """
+        path = self._composed_path("seed", "location").maps
+        breakpoints = self.breakpoints("seed", "location")
+        result: Optional[int] = None
 
-        if not map:
-            raise Exception("No seed map")
+        # Overlapping seed ranges only need to be searched once
+        for seed in RangeSet(seeds):
+            first = bisect.bisect_right(breakpoints, seed.start)
+            last = bisect.bisect_left(breakpoints, seed.stop)
 
-        locations = self.trace([seed], map)
-        first_location = sorted(locations, key=lambda r: r.start)[0]
-        return first_location.start
+            for value in [seed.start] + breakpoints[first:last]:
+                for map in path:
+                    value = map.map_value(value)
+                if result is None or value < result:
+                    result = value
+
+        if result is None:
+            raise Exception("No seeds")
+
+        return result
+
+    def breakpoints(self, source: str, destination: str) -> list[int]:
+        """
+        Returns the source values where the offset between source and
+        destination can change. The result is cached, and when a map changes
+        only the part of the path before it is pulled back again.
+        """
+        return self._composed_path(source, destination).breakpoints()
+
+    def inverse_convert_range(
+        self, r: range, source: str, destination: str
+    ) -> list[range]:
+        """
+        Returns the source values that convert to the destination values in r.
+        """
+        ranges = [r]
+        for map in reversed(self._composed_path(source, destination).maps):
+            ranges = map.inverse_trace(ranges)
+        return ranges
+
+    def compose(self, source: str, destination: str) -> PiecewiseMap:
+        """
+        Composes the maps along the path from source to destination into one
+        PiecewiseMap, so that a value can be converted with a single lookup.
+        The result is cached, and when a map changes only the compositions
+        from that map onward are redone.
+        """
+        return self._composed_path(source, destination).composed()
+
+    def convert(self, value: int, source: str, destination: str) -> int:
+        return self.compose(source, destination).map(value)
+
+    def convert_range(self, r: range, source: str, destination: str) -> list[range]:
+        return self.compose(source, destination).map_range(r)
+
+    def convert_array(
+        self, values: np.ndarray, source: str, destination: str
+    ) -> np.ndarray:
+        return self.compose(source, destination).map_array(values)
+
+    def seed_values(self) -> np.ndarray:
+        """
+        Returns the start of every seed range as an array, which is every
+        seed when the almanac was parsed with seeds_as_ranges=False.
+        """
+        return np.fromiter(
+            (seed.start for seed in self.seeds), dtype=np.int64, count=len(self.seeds)
+        )
+
+    def min_location_for_seed_values(self, seeds: np.ndarray) -> int:
+        return int(self.convert_array(seeds, "seed", "location").min())
+
+    def trace_set(
+        self, ranges: Iterable[range], source: str, destination: str
+    ) -> RangeSet:
+        """
+        Traces ranges of source values through every map to destination as a
+        single RangeSet, normalizing after each map so that fragments split
+        off by one map are merged back together before the next.
+        """
+        result = RangeSet(ranges)
+        for map in self._composed_path(source, destination).maps:
+            result = RangeSet(map.trace(result.ranges))
+        return result
 
     def trace(self, ranges: list[range], map: Map) -> list[range]:
-        next_ranges = map.trace(ranges)
+        next_ranges = RangeSet.normalize(map.trace(ranges))
 
         next_map = self.map_from(map.destination)
         if next_map:
@@ -246,12 +795,12 @@ class Almanac:
 
 def part1(lines):
     almanac = Almanac.parse(lines, seeds_as_ranges=False)
-    return min(almanac.min_location_for_seed(seed) for seed in almanac.seeds)
+    return almanac.min_location_for_seed_values(almanac.seed_values())
 
 
 def part2(lines):
     almanac = Almanac.parse(lines)
-    return min(almanac.min_location_for_seed(seed) for seed in almanac.seeds)
+    return almanac.min_location_for_seeds(almanac.seeds)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,51 @@
 import os
+import random
 import unittest
 
-from day05 import part1, part2, Map, MapEntry
+import numpy as np
+
+from day05 import part1, part2, Almanac, Map, MapEntry, PiecewiseMap, RangeSet
+
+
+CATEGORIES = ["seed", "soil", "fertilizer", "water", "light", "location"]
+
+
+def random_map(rng, source, destination, overlap=False):
+    # Source ranges never overlap. Unless overlap is set, destination ranges
+    # don't either, like the puzzle input.
+    map = Map(source, destination)
+    lengths = [rng.randint(1, 15) for _ in range(rng.randint(0, 6))]
+
+    dest_starts = [0] * len(lengths)
+    dest_start = rng.randint(0, 20)
+    for index in rng.sample(range(len(lengths)), len(lengths)):
+        dest_starts[index] = rng.randint(0, 40) if overlap else dest_start
+        dest_start += lengths[index] + rng.choice([0, rng.randint(1, 10)])
+
+    source_start = rng.randint(0, 10)
+    for length, dest_start in zip(lengths, dest_starts):
+        map.add(source_start, dest_start, length)
+        source_start += length + rng.choice([0, 0, rng.randint(1, 10)])
+
+    return map
+
+
+def random_almanac(seed, overlap=False):
+    rng = random.Random(seed)
+    maps = [random_map(rng, a, b, overlap) for a, b in zip(CATEGORIES, CATEGORIES[1:])]
+    seeds = [range(s, s + rng.randint(1, 30)) for s in rng.sample(range(120), 5)]
+    return Almanac(seeds, maps)
+
+
+def map_value(map, value):
+    for e in map.entries:
+        if value in e.source():
+            return value + e.dest_offset()
+    return value
+
+
+def values(ranges):
+    return sorted(v for r in ranges for v in r)
 
 
 class TestDay05(unittest.TestCase):
@@ -59,6 +103,287 @@ class TestDay05(unittest.TestCase):
                 t["expected"], sorted(map.trace(t["input"]), key=lambda r: r.start)
             )
 
+    def test_map_keeps_entries_sorted(self):
+        map = Map("soil", "fertilizer")
+        map.add(50, 70, 10)
+        map.add(0, 100, 5)
+        map.add(20, 30, 5)
+        self.assertEqual(
+            [e.source() for e in map.entries],
+            [range(0, 5), range(20, 25), range(50, 60)],
+        )
+        self.assertEqual(
+            sorted(map.trace([range(-2, 70)]), key=lambda r: r.start),
+            [
+                range(-2, 0),
+                range(5, 20),
+                range(25, 50),
+                range(30, 35),
+                range(60, 70),
+                range(70, 80),
+                range(100, 105),
+            ],
+        )
+
+    def test_map_trace_matches_entries(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            map = random_map(rng, "soil", "fertilizer")
+            ranges = [
+                range(s, s + rng.randint(0, 40)) for s in rng.sample(range(-10, 100), 3)
+            ]
+            expected = sorted(map_value(map, v) for r in ranges for v in r)
+            self.assertEqual(values(map.trace(ranges)), expected)
+
+    def test_piecewise_map(self):
+        map = PiecewiseMap([5, 10, 20], [20, -3, 0])
+        self.assertEqual(
+            [map.map(v) for v in (0, 5, 9, 10, 19, 20, 100)],
+            [0, 25, 29, 7, 16, 20, 100],
+        )
+        self.assertEqual(
+            map.map_range(range(3, 12)), [range(3, 5), range(25, 30), range(7, 9)]
+        )
+        self.assertEqual(map.map_range(range(30, 40)), [range(30, 40)])
+
+    def test_almanac_compose(self):
+        for seed in range(10):
+            almanac = random_almanac(seed)
+            composed = almanac.compose("seed", "location")
+            first_map = almanac.map_from("seed")
+
+            for value in range(-5, 150):
+                expected = almanac.trace([range(value, value + 1)], first_map)
+                self.assertEqual([composed.map(value)], values(expected))
+
+            for r in almanac.seeds:
+                expected = almanac.trace([r], first_map)
+                self.assertEqual(RangeSet(composed.map_range(r)).ranges, expected)
+
+    def test_almanac_path(self):
+        rng = random.Random(1)
+        pairs = [
+            ("seed", "soil"),
+            ("soil", "water"),
+            ("water", "light"),
+            ("light", "location"),
+            ("seed", "fertilizer"),
+            ("fertilizer", "light"),
+        ]
+        almanac = Almanac([], [random_map(rng, a, b) for a, b in pairs])
+
+        path = almanac.path("seed", "location")
+        self.assertEqual(
+            [(m.source, m.destination) for m in path],
+            [("seed", "fertilizer"), ("fertilizer", "light"), ("light", "location")],
+        )
+        self.assertEqual(almanac.path("water", "water"), [])
+
+        with self.assertRaises(Exception):
+            almanac.path("location", "seed")
+
+        for value in range(-5, 150):
+            expected = value
+            for map in almanac.path("soil", "location"):
+                expected = map_value(map, expected)
+            self.assertEqual(almanac.convert(value, "soil", "location"), expected)
+
+        self.assertIs(
+            almanac.compose("soil", "location"), almanac.compose("soil", "location")
+        )
+        self.assertEqual(almanac.map_to("light").source, "water")
+
+    def test_almanac_reuses_paths(self):
+        almanac = random_almanac(6)
+        expected = almanac.min_location_for_seeds(almanac.seeds)
+
+        def path(source, destination):
+            raise Exception("Path searched again")
+
+        almanac.path = path
+        self.assertEqual(almanac.min_location_for_seeds(almanac.seeds), expected)
+        almanac.inverse_convert_range(range(0, 10), "seed", "location")
+        almanac.trace_set(almanac.seeds, "seed", "location")
+
+    def test_almanac_convert_array(self):
+        almanac = random_almanac(2)
+        seeds = np.arange(-5, 200, dtype=np.int64)
+
+        expected = [almanac.convert(int(v), "seed", "location") for v in seeds]
+        actual = almanac.convert_array(seeds, "seed", "location")
+        self.assertEqual(actual.tolist(), expected)
+        self.assertEqual(almanac.min_location_for_seed_values(seeds), min(expected))
+
+        empty = PiecewiseMap([], [])
+        self.assertEqual(empty.map_array(seeds[:3]).tolist(), [-5, -4, -3])
+
+    def test_map_inverse_trace(self):
+        rng = random.Random(3)
+        domain = range(-20, 200)
+
+        for i in range(40):
+            map = random_map(rng, "soil", "fertilizer", overlap=i % 2 == 1)
+            r = range(rng.randint(-5, 100), rng.randint(100, 150))
+            expected = [v for v in domain if map.map_value(v) in r]
+            self.assertEqual(values(map.inverse_trace([r])), expected)
+
+            point = rng.randint(0, 120)
+            expected = [v for v in domain if map.map_value(v) == point]
+            self.assertEqual(sorted(map.preimage(point)), expected)
+
+    def test_almanac_min_location_for_seeds(self):
+        for seed in range(20):
+            almanac = random_almanac(seed, overlap=seed % 2 == 1)
+            path = almanac.path("seed", "location")
+
+            def location(value):
+                for map in path:
+                    value = map_value(map, value)
+                return value
+
+            expected = min(location(v) for r in almanac.seeds for v in r)
+            self.assertEqual(almanac.min_location_for_seeds(almanac.seeds), expected)
+
+            composed = almanac.compose("seed", "location")
+            for point in composed.starts:
+                self.assertIn(point, almanac.breakpoints("seed", "location"))
+
+            r = range(30, 60)
+            expected = [v for v in range(-20, 300) if location(v) in r]
+            self.assertEqual(
+                values(almanac.inverse_convert_range(r, "seed", "location")), expected
+            )
+
+    def test_almanac_overlapping_destinations(self):
+        seed_to_soil = Map("seed", "soil")
+        for source_start, dest_start, length in [
+            (0, 5, 10),
+            (11, 6, 3),
+            (15, 22, 2),
+            (18, 23, 5),
+        ]:
+            seed_to_soil.add(source_start, dest_start, length)
+        soil_to_location = Map("soil", "location")
+        for source_start, dest_start, length in [
+            (0, 27, 8),
+            (13, 0, 2),
+            (19, 30, 3),
+            (25, 21, 8),
+        ]:
+            soil_to_location.add(source_start, dest_start, length)
+
+        almanac = Almanac([range(0, 60)], [seed_to_soil, soil_to_location])
+        self.assertEqual(almanac.min_location_for_seeds(almanac.seeds), 0)
+        self.assertEqual(almanac.trace_set(almanac.seeds, "seed", "location").min(), 0)
+
+    def test_range_set(self):
+        ranges = [
+            range(10, 20),
+            range(0, 0),
+            range(15, 25),
+            range(25, 30),
+            range(-5, 3),
+        ]
+        self.assertEqual(RangeSet(ranges).ranges, [range(-5, 3), range(10, 30)])
+        self.assertEqual(RangeSet(ranges).min(), -5)
+        self.assertEqual(RangeSet([range(0, 10), range(2, 4)]).ranges, [range(0, 10)])
+        self.assertEqual(len(RangeSet()), 0)
+
+    def test_almanac_trace_set(self):
+        for seed in range(10):
+            almanac = random_almanac(seed)
+            seeds = almanac.seeds + [
+                range(s.start + 3, s.stop + 5) for s in almanac.seeds
+            ]
+
+            expected = set()
+            for r in seeds:
+                for v in r:
+                    expected.add(almanac.convert(v, "seed", "location"))
+
+            locations = almanac.trace_set(seeds, "seed", "location")
+            self.assertEqual(values(locations), sorted(expected))
+            self.assertEqual(locations, RangeSet(locations.ranges))
+            self.assertEqual(locations.min(), almanac.min_location_for_seeds(seeds))
+
+    def test_map_remove_and_update(self):
+        map = Map("soil", "fertilizer")
+        map.add(20, 30, 5)
+        map.add(50, 70, 10)
+        changes = []
+        map.add_listener(changes.append)
+
+        self.assertEqual(map.remove(20).source(), range(20, 25))
+        self.assertEqual(map.map_value(21), 21)
+        map.update(50, 0, 5)
+        self.assertEqual([map.map_value(v) for v in (50, 54, 55)], [0, 4, 55])
+        self.assertEqual(map.preimage(2), [2, 52])
+        self.assertEqual(changes, [map, map])
+
+        with self.assertRaises(Exception):
+            map.remove(20)
+
+    def test_almanac_incremental_updates(self):
+        rng = random.Random(4)
+        almanac = random_almanac(4)
+        almanac.register_seeds("puzzle", almanac.seeds)
+        almanac.register_seeds("low", [range(0, 10)])
+
+        # Moved and added entries go to unused destinations (and added ones
+        # to unused sources) so that ranges never overlap
+        spare = iter(range(500, 2000, 20))
+
+        for _ in range(30):
+            map = rng.choice(almanac.maps)
+            starts = [e.source().start for e in map.entries]
+            if starts and rng.random() < 0.3:
+                map.remove(rng.choice(starts))
+            elif starts and rng.random() < 0.5:
+                start = rng.choice(starts)
+                length = len(map.entries[starts.index(start)].source())
+                map.update(start, next(spare), length)
+            else:
+                map.add(next(spare), next(spare), 5)
+
+            fresh = Almanac(almanac.seeds, [])
+            for m in almanac.maps:
+                copy = Map(m.source, m.destination)
+                for e in m.entries:
+                    copy.add(e.source().start, e.dest().start, len(e.source()))
+                fresh.add_map(copy)
+
+            for source, destination in [("seed", "location"), ("soil", "light")]:
+                self.assertEqual(
+                    almanac.compose(source, destination).map_range(range(-5, 2000)),
+                    fresh.compose(source, destination).map_range(range(-5, 2000)),
+                )
+                self.assertEqual(
+                    almanac.breakpoints(source, destination),
+                    fresh.breakpoints(source, destination),
+                )
+
+            def location(value):
+                for m in almanac.path("seed", "location"):
+                    value = map_value(m, value)
+                return value
+
+            self.assertEqual(
+                almanac.min_location_for_registered("puzzle"),
+                min(location(v) for r in almanac.seeds for v in r),
+            )
+            self.assertEqual(
+                almanac.min_location_for_registered("low"),
+                min(location(v) for v in range(0, 10)),
+            )
+
+    def test_almanac_keeps_unaffected_compositions(self):
+        almanac = random_almanac(5)
+        soil = almanac.compose("seed", "soil")
+        almanac.map_from("light").add(1000, 0, 5)
+
+        self.assertIs(almanac.compose("seed", "soil"), soil)
+        self.assertEqual(almanac.convert(1002, "seed", "location"), 2)
+
     def test_part1(self):
         input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
         with open(input_filename, "r") as input_file:
@@ -1,4 +1,4 @@
-from math import floor
+from math import floor, isqrt
 import re
 import sys
 from typing import Optional
@@ -93,6 +93,37 @@ def count_ways_to_win_with_math(target_time, target_distance):
     return ways_to_win
 
 
+def count_ways_to_win_exact(target_time, target_distance):
+    # (t - x) * x > d  <=>  x^2 - tx + d < 0, so the winning charge times lie
+    # strictly between the roots (t +/- sqrt(t^2 - 4d)) / 2. Everything stays
+    # in integers so that huge races don't lose precision.
+
+    discriminant = target_time * target_time - 4 * target_distance
+    if discriminant <= 0:
+        # At best the race ties the record
+        return 0
+
+    def wins(charge_time):
+        return (target_time - charge_time) * charge_time > target_distance
+
+    # isqrt rounds down, so this starts just below the lower root and only
+    # ever has a few steps to take
+    lower = (target_time - isqrt(discriminant)) // 2 - 1
+    while lower <= target_time // 2 and not wins(lower):
+        lower += 1
+
+    if lower > target_time // 2:
+        return 0
+
+    # Charging for no time at all (or the whole race) doesn't count
+    lower = max(lower, 1)
+
+    # Distance is symmetric around t/2
+    upper = target_time - lower
+
+    return max(upper - lower + 1, 0)
+
+
 def product(things):
     result = 0
 
@@ -105,7 +136,7 @@ def product(things):
 def part1(lines):
     (times, distances) = parse_input(lines)
     return product(
-        count_ways_to_win_with_math(time, distance)
+        count_ways_to_win_exact(time, distance)
         for time, distance in zip(times, distances)
     )
 
@@ -114,7 +145,7 @@ def part2(lines):
     (times, distances) = parse_input(lines)
     time = int("".join(str(t) for t in times))
     distance = int("".join(str(d) for d in distances))
-    return count_ways_to_win_with_math(time, distance)
+    return count_ways_to_win_exact(time, distance)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,35 @@
 import os
 import unittest
 
-from day06 import part1, part2
+from day06 import count_ways_to_win_exact, count_ways_to_win_naive, part1, part2
 
 
 class TestDay06(unittest.TestCase):
+    def test_count_ways_to_win_exact(self):
+        for time in range(0, 40):
+            # Covers records that can't be reached, tied, or are below zero
+            for distance in range(-3, time * time // 4 + 3):
+                self.assertEqual(
+                    count_ways_to_win_exact(time, distance),
+                    count_ways_to_win_naive([time], [distance]),
+                    (time, distance),
+                )
+
+    def test_count_ways_to_win_exact_big(self):
+        time = 10**30 + 7
+        # The best charge time only ties this record
+        self.assertEqual(count_ways_to_win_exact(time, time * time // 4), 0)
+
+        for distance in (10**50, time * time // 4 - 1, time * time // 4 - 10**20):
+            ways = count_ways_to_win_exact(time, distance)
+            lower = (time - ways + 1) // 2
+
+            def wins(x):
+                return (time - x) * x > distance
+
+            self.assertTrue(wins(lower) and wins(lower + ways - 1))
+            self.assertFalse(wins(lower - 1) or wins(lower + ways))
+
     def test_part1(self):
         input_filename = os.path.join(os.path.dirname(__file__), "test_input.txt")
         with open(input_filename, "r") as input_file: